@@ -1,10 +1,14 @@
+from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Config(BaseSettings):
     """Application configuration sourced from environment variables."""
 
-    model_config = SettingsConfigDict(env_file="./.env", extra="ignore")
+    # Field names match the environment variables exactly; skip case-folding on lookup.
+    model_config = SettingsConfigDict(env_file="./.env", extra="ignore", case_sensitive=True)
 
     # Test variables (optional)
     ZULIP_BOT_TOKEN_TEST: str | None = None
@@ -24,10 +28,98 @@ class Config(BaseSettings):
     GENAI_API_KEY: str
     ZULIP_AUTH_TOKEN: str
 
+    # Connections kept per process; size against the number of uvicorn workers so the
+    # total stays under the MySQL server's max_connections.
+    DB_POOL_SIZE: int = 5
+    # Rows of a query result passed on to the answer prompt.
+    DB_MAX_ROWS: int = 200
+    # Character budget for the result text handed to the model; rows past it are dropped.
+    DB_MAX_RESULT_CHARS: int = 20_000
+
     # History storage configuration
+    HISTORY_BACKEND: Literal["tinydb", "sqlite"] = "tinydb"
     HISTORY_DB_PATH: str = "./data/history.json"
+    HISTORY_SQLITE_PATH: str = "./data/history.sqlite3"
+    # TinyDB only: buffered saves reach disk at most this long after they are made, bounding
+    # what a crash can lose; 0 flushes only every few saves and on shutdown.
+    HISTORY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Persist history saves on a worker thread instead of on the request path.
+    HISTORY_WRITE_BEHIND: bool = False
+    # Write-behind only: wait this long before each write so a burst of saves lands as one.
+    HISTORY_WRITE_DELAY_SECONDS: float = 0.2
     HISTORY_MAX_LENGTH: int = 5
+    # Most recent turns sent to Gemini as chat context (independent of what is stored).
+    GEMINI_HISTORY_TURNS: int = 6
     ENABLE_LANGGRAPH: bool = True
 
+    # Models for intent classification and chatbot/unsupported replies. SQL generation
+    # and answer summarization stay on the primary model.
+    GEMINI_INTENT_MODEL: str = "gemini-2.5-flash"
+    GEMINI_CHAT_MODEL: str = "gemini-2.5-flash"
+
+    # Show chatbot/unsupported replies while Gemini writes them by editing one Zulip message.
+    STREAM_SMALL_TALK: bool = False
+    # Same for the summary of database results, which runs on the slower primary model.
+    STREAM_ANSWERS: bool = False
+
+    # Safe SQL reused for repeated self-contained requests; a TTL of 0 disables it.
+    SQL_CACHE_SIZE: int = 512
+    SQL_CACHE_TTL_SECONDS: int = 86400
+
+    # Query results reused for identical SQL within this many seconds (a user re-asking, or
+    # rephrasing into the same query); 0 disables it.
+    DB_RESULT_CACHE_SIZE: int = 256
+    DB_RESULT_CACHE_TTL_SECONDS: int = 60
+
+    # Gemini replies kept for byte-identical requests; 0 disables the cache.
+    GEMINI_RESPONSE_CACHE_SIZE: int = 1024
+    # Seconds a cached reply stays valid; 0 keeps replies until they are evicted.
+    GEMINI_RESPONSE_CACHE_TTL_SECONDS: int = 3600
+
+    # A sender repeating a message within this many seconds reuses its intent (retries and
+    # duplicate deliveries); 0 disables.
+    INTENT_RETRY_WINDOW_SECONDS: int = 30
+    # Reuse intent labels for messages whose embeddings are near-identical to earlier ones.
+    INTENT_SEMANTIC_CACHE: bool = False
+    INTENT_SEMANTIC_THRESHOLD: float = 0.92
+    # Same for small-talk replies; stricter because the whole reply is reused, not a label.
+    CHATBOT_SEMANTIC_CACHE: bool = False
+    CHATBOT_SEMANTIC_THRESHOLD: float = 0.96
+    # JSON list of {"question", "answer"} pairs answered without a model call; empty disables.
+    FAQ_PATH: str = ""
+    FAQ_THRESHOLD: float = 0.9
+
+    # Serve the schema-heavy SQL prompt from a Gemini explicit context cache.
+    GEMINI_CONTEXT_CACHE: bool = False
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 3600
+
+    @property
+    def effective_zulip_email(self) -> str:
+        """Bot email to use, preferring the test account in TEST_MODE."""
+
+        if self.TEST_MODE:
+            return self.ZULIP_BOT_EMAIL_TEST or self.ZULIP_BOT_EMAIL
+        return self.ZULIP_BOT_EMAIL
+
+    @property
+    def effective_zulip_token(self) -> str:
+        """Bot API key to use, preferring the test account in TEST_MODE."""
+
+        if self.TEST_MODE:
+            return self.ZULIP_BOT_TOKEN_TEST or self.ZULIP_BOT_TOKEN
+        return self.ZULIP_BOT_TOKEN
+
+    @property
+    def effective_auth_token(self) -> str:
+        """Outgoing-webhook token to accept, preferring the test token in TEST_MODE."""
+
+        if self.TEST_MODE:
+            return self.ZULIP_AUTH_TOKEN_TEST or self.ZULIP_AUTH_TOKEN
+        return self.ZULIP_AUTH_TOKEN
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Config:
+    """Return the process-wide settings, parsed from the environment on first use."""
 
-config = Config()
+    return Config()
@@ -0,0 +1,155 @@
+"""Gemini explicit context caching for large, static system prompts."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from datetime import timedelta
+from typing import Any
+
+import google.generativeai as genai
+import orjson
+
+# Recreate a little before the server-side expiry so in-flight requests never race it.
+_EXPIRY_MARGIN_SECONDS = 60.0
+# After a failed create, use the plain system instruction for a while before retrying.
+_FAILURE_BACKOFF_SECONDS = 300.0
+# A handle used within this long of its expiry has its TTL extended in the background.
+_REFRESH_AHEAD_SECONDS = 300.0
+
+
+class GeminiContextCache:
+    """Create and reuse Gemini ``CachedContent`` handles keyed by model and prompt.
+
+    A cached system instruction is billed and processed once per TTL instead of being
+    re-sent with every request. A handle that is used shortly before it expires has its
+    TTL extended on a background thread while the current handle keeps serving, so busy
+    prompts never wait on a blocking create; idle ones lapse and are recreated lazily.
+    Methods are safe to call from worker threads.
+    """
+
+    def __init__(self, *, ttl: timedelta = timedelta(hours=1), logger: Any | None = None) -> None:
+        self._ttl = ttl
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[Any, float]] = {}
+        self._failed_until: dict[tuple[str, str], float] = {}
+        self._refreshing: set[tuple[str, str]] = set()
+        # One lock per (model, digest), held across the create round trip.
+        self._create_locks: dict[tuple[str, str], threading.Lock] = {}
+        # Models bound to a handle, per generation config; rebuilt when the handle changes.
+        self._models: dict[tuple[str, str, bytes], tuple[Any, Any]] = {}
+
+    def model_for(
+        self,
+        *,
+        model_name: str,
+        system_instruction: str,
+        generation_config: dict[str, Any] | None = None,
+        content_digest: str | None = None,
+    ) -> Any | None:
+        """Return a model bound to the cached prompt, or ``None`` if caching is unavailable.
+
+        ``content_digest`` identifies ``system_instruction`` when the caller already has a
+        fingerprint for it; otherwise the prompt is hashed on every call.
+        """
+
+        if content_digest is None:
+            content_digest = hashlib.sha256(system_instruction.encode()).hexdigest()
+        cached_content = self._cached_content(model_name, system_instruction, content_digest)
+        if cached_content is None:
+            return None
+
+        model_key = (
+            model_name,
+            content_digest,
+            orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS),
+        )
+        with self._lock:
+            entry = self._models.get(model_key)
+            if entry is not None and entry[0] is cached_content:
+                return entry[1]
+            model = genai.GenerativeModel.from_cached_content(
+                cached_content,
+                generation_config=generation_config,
+            )
+            self._models[model_key] = (cached_content, model)
+            return model
+
+    def _cached_content(
+        self, model_name: str, system_instruction: str, content_digest: str
+    ) -> Any | None:
+        key = (model_name, content_digest)
+        with self._lock:
+            found, cached_content = self._lookup(key)
+            if found:
+                return cached_content
+            key_lock = self._create_locks.setdefault(key, threading.Lock())
+
+        # Creating is a network round trip: hold only this key's lock, so hits and creates
+        # for other prompts proceed, while concurrent misses for this one wait for its result.
+        with key_lock:
+            with self._lock:
+                found, cached_content = self._lookup(key)
+            if found:
+                return cached_content
+
+            try:
+                cached_content = genai.caching.CachedContent.create(
+                    model=f"models/{model_name}",
+                    system_instruction=system_instruction,
+                    ttl=self._ttl,
+                )
+            except Exception:
+                if self._logger is not None:
+                    self._logger.error(
+                        "Gemini context cache create failed for %s", model_name, exc_info=True
+                    )
+                with self._lock:
+                    self._failed_until[key] = time.monotonic() + _FAILURE_BACKOFF_SECONDS
+                return None
+
+            with self._lock:
+                self._entries[key] = (cached_content, self._expires_at(time.monotonic()))
+        if self._logger is not None:
+            self._logger.info("Gemini context cache created for %s", model_name)
+        return cached_content
+
+    def _lookup(self, key: tuple[str, str]) -> tuple[bool, Any | None]:
+        """Return ``(True, handle or None)`` when no create is needed; caller holds the lock."""
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            if entry[1] - now <= self._refresh_ahead() and key not in self._refreshing:
+                self._refreshing.add(key)
+                threading.Thread(target=self._extend, args=(key, entry[0]), daemon=True).start()
+            return True, entry[0]
+        if self._failed_until.get(key, 0.0) > now:
+            return True, None
+        return False, None
+
+    def _extend(self, key: tuple[str, str], cached_content: Any) -> None:
+        try:
+            cached_content.update(ttl=self._ttl)
+        except Exception:
+            # The handle lapses as scheduled and the next request recreates it.
+            if self._logger is not None:
+                self._logger.error(
+                    "Gemini context cache refresh failed for %s", key[0], exc_info=True
+                )
+        else:
+            with self._lock:
+                if self._entries.get(key, (None,))[0] is cached_content:
+                    self._entries[key] = (cached_content, self._expires_at(time.monotonic()))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _expires_at(self, now: float) -> float:
+        return now + max(self._ttl.total_seconds() - _EXPIRY_MARGIN_SECONDS, 0.0)
+
+    def _refresh_ahead(self) -> float:
+        # Short TTLs would otherwise sit permanently inside the refresh window.
+        return min(_REFRESH_AHEAD_SECONDS, self._ttl.total_seconds() / 4)
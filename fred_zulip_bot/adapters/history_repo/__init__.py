@@ -1,5 +1,7 @@
 """History repository abstractions."""
 
+from fred_zulip_bot.adapters.history_repo.sqlite_repo import SqliteHistoryRepo
 from fred_zulip_bot.adapters.history_repo.tinydb_repo import TinyDbHistoryRepo
+from fred_zulip_bot.adapters.history_repo.write_behind import WriteBehindHistoryRepo
 
-__all__ = ["TinyDbHistoryRepo"]
+__all__ = ["SqliteHistoryRepo", "TinyDbHistoryRepo", "WriteBehindHistoryRepo"]
@@ -2,14 +2,29 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Protocol
 
 
 class HistoryRepository(Protocol):
-    """Storage abstraction for persisting chat history per user."""
+    """Storage abstraction for persisting chat history per user.
+
+    The async chat path uses ``aget``/``asave``; implementations that subclass this
+    protocol inherit thread-offloading defaults and must therefore be thread-safe.
+    """
 
     def get(self, email: str) -> list[dict[str, Any]]:
         """Return the stored history for the given email address."""
 
     def save(self, email: str, history: list[dict[str, Any]]) -> None:
         """Persist the provided history for the given email address."""
+
+    async def aget(self, email: str) -> list[dict[str, Any]]:
+        """Run ``get`` on a worker thread; file and SQLite reads must not block the loop."""
+
+        return await asyncio.to_thread(self.get, email)
+
+    async def asave(self, email: str, history: list[dict[str, Any]]) -> None:
+        """Run ``save`` on a worker thread, for the same reason."""
+
+        await asyncio.to_thread(self.save, email, list(history))
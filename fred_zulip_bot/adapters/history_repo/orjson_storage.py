@@ -0,0 +1,41 @@
+"""orjson-backed storage for the TinyDB history store."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, cast
+
+import orjson
+from tinydb.storages import Storage
+
+
+class OrjsonStorage(Storage):
+    """Serialize the TinyDB document store with orjson instead of the stdlib ``json``.
+
+    TinyDB reads and rewrites the whole file on every operation, so (de)serialization
+    sits on the chat hot path. orjson does that work in C and speaks ``bytes`` directly,
+    skipping the text encode/decode step. The on-disk format stays plain JSON, so files
+    written by TinyDB's default ``JSONStorage`` remain readable.
+
+    Writes go to a sibling temp file that is then renamed over the store, so a crash
+    mid-write leaves the previous contents intact instead of a truncated file.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+    def read(self) -> dict[str, dict[str, Any]] | None:
+        # Open directly instead of exists()/stat() first: one syscall fewer, no TOCTOU.
+        try:
+            raw = self._path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if not raw:
+            return None
+        return cast(dict[str, dict[str, Any]], orjson.loads(raw))
+
+    def write(self, data: dict[str, dict[str, Any]]) -> None:
+        tmp_path = self._path.with_name(f"{self._path.name}.tmp")
+        tmp_path.write_bytes(orjson.dumps(data))
+        tmp_path.replace(self._path)
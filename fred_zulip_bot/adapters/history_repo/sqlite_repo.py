@@ -0,0 +1,81 @@
+"""SQLite-backed history repository implementation."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+
+
+class SqliteHistoryRepo(HistoryRepository):
+    """Persist chat histories in a SQLite table keyed by email.
+
+    Each save rewrites a single row through the primary-key B-tree instead of the whole
+    store, and WAL mode lets readers proceed while a write is in flight. Histories are
+    stored as orjson-encoded blobs; the upsert only rewrites a row whose stored bytes
+    differ, so an unchanged save touches no pages and adds nothing to the WAL.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        max_length: int = 20,
+        logger: Any | None = None,
+    ) -> None:
+        self._db_path = db_path
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_length = max_length
+        self._logger = logger
+        self._lock = threading.Lock()
+        # Autocommit: every upsert is its own short transaction.
+        self._conn = sqlite3.connect(self._db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history (email TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+
+    def get(self, email: str) -> list[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM history WHERE email = ?", (email,)
+            ).fetchone()
+        if row is None:
+            return []
+
+        try:
+            history = orjson.loads(row[0])
+        except orjson.JSONDecodeError:
+            history = None
+
+        if isinstance(history, list):
+            return [item for item in history if isinstance(item, dict)]
+
+        if self._logger is not None:
+            self._logger.warning("history record for %s is malformed; resetting", email)
+        return []
+
+    def save(self, email: str, history: list[dict[str, Any]]) -> None:
+        # Serialized immediately, so only slice when there is something to drop.
+        if len(history) > self._max_length:
+            history = history[-self._max_length :]
+        data = orjson.dumps(history)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO history (email, data) VALUES (?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET data = excluded.data "
+                "WHERE history.data IS NOT excluded.data",
+                (email, data),
+            )
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+
+        with self._lock:
+            self._conn.close()
@@ -2,16 +2,46 @@
 
 from __future__ import annotations
 
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-from tinydb import Query, TinyDB
+from tinydb import TinyDB
+from tinydb.middlewares import CachingMiddleware
+from tinydb.table import Document
 
 from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+from fred_zulip_bot.adapters.history_repo.orjson_storage import OrjsonStorage
+
+
+@lru_cache(maxsize=4096)
+def _doc_id_for(email: str) -> int:
+    """Map an email to its TinyDB doc_id; memoized since every get/save needs it."""
+
+    digest = hashlib.blake2b(email.encode(), digest_size=7).digest()
+    return int.from_bytes(digest, "big")
 
 
 class TinyDbHistoryRepo(HistoryRepository):
-    """Persist chat histories in a TinyDB document store."""
+    """Persist chat histories in a TinyDB document store.
+
+    Recently used histories are kept in a small in-process LRU so a user sending a burst
+    of messages does not re-read and re-parse the store on every turn. The cache assumes
+    this repository is the only writer of the file, which holds for a single app process.
+
+    Writes go through TinyDB's ``CachingMiddleware`` and reach disk every
+    ``write_cache_size`` saves, ``flush_interval`` seconds after the first unflushed save,
+    or on ``flush``/``close``, instead of rewriting the whole file on every chat turn. A
+    crash or kill therefore loses at most the saves of the last ``flush_interval`` seconds
+    (and never more than ``write_cache_size - 1`` of them); a ``flush_interval`` of 0 drops
+    the timer and leaves only the save-count bound.
+
+    Records are keyed by a hash of the email used as the TinyDB ``doc_id`` so lookups hit
+    TinyDB's internal dict instead of scanning every document with a ``Query``.
+    """
 
     def __init__(
         self,
@@ -19,18 +49,90 @@ class TinyDbHistoryRepo(HistoryRepository):
         *,
         max_length: int = 20,
         table_name: str = "history",
+        cache_size: int = 256,
+        write_cache_size: int = 10,
+        flush_interval: float = 1.0,
         logger: Any | None = None,
     ) -> None:
         self._db_path = db_path
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._db = TinyDB(self._db_path)
+        self._storage = CachingMiddleware(OrjsonStorage)  # type: ignore[no-untyped-call]
+        self._storage.WRITE_CACHE_SIZE = max(write_cache_size, 1)
+        self._db = TinyDB(self._db_path, storage=self._storage)
         self._table = self._db.table(table_name)
         self._max_length = max_length
         self._logger = logger
-        self._query = Query()
+        self._cache: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._cache_size = max(cache_size, 0)
+        self._flush_interval = flush_interval
+        # Reads and saves run on worker threads, as does the flush timer; neither TinyDB nor
+        # the read cache is thread-safe.
+        self._lock = threading.RLock()
+        self._flush_timer: threading.Timer | None = None
+        self._migrate_legacy_records()
 
     def get(self, email: str) -> list[dict[str, Any]]:
-        record = self._table.get(self._query.email == email)
+        with self._lock:
+            cached = self._cache.get(email)
+            if cached is not None:
+                self._cache.move_to_end(email)
+                return list(cached)
+
+            history = self._load(email)
+            self._remember(email, history)
+            return list(history)
+
+    def save(self, email: str, history: list[dict[str, Any]]) -> None:
+        # Always copy: the stored document and the read cache must not alias the caller's
+        # list, which ChatService keeps appending to.
+        trimmed = history[-self._max_length :]
+        with self._lock:
+            if self._cache.get(email) == trimmed:
+                # Unchanged since the last read/save: skip the upsert and the eventual rewrite.
+                self._cache.move_to_end(email)
+                return
+            self._table.upsert(
+                Document({"email": email, "history": trimmed}, doc_id=self._doc_id(email))
+            )
+            self._schedule_flush()
+            self._remember(email, trimmed)
+
+    def flush(self) -> None:
+        """Write any cached changes to disk."""
+
+        with self._lock:
+            self._cancel_flush()
+            self._storage.flush()  # type: ignore[no-untyped-call]
+
+    def close(self) -> None:
+        """Flush pending writes and close the underlying TinyDB instance."""
+
+        with self._lock:
+            self._cancel_flush()
+            self._db.close()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_interval <= 0 or self._flush_timer is not None:
+            return
+        timer = threading.Timer(self._flush_interval, self._flush_due)
+        timer.daemon = True
+        self._flush_timer = timer
+        timer.start()
+
+    def _cancel_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def _flush_due(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            if self._logger is not None:
+                self._logger.error("history flush failed", exc_info=True)
+
+    def _load(self, email: str) -> list[dict[str, Any]]:
+        record = self._table.get(doc_id=self._doc_id(email))
         if record is None:
             return []
 
@@ -47,14 +149,37 @@ class TinyDbHistoryRepo(HistoryRepository):
             self._logger.warning("history record for %s is malformed; resetting", email)
         return []
 
-    def save(self, email: str, history: list[dict[str, Any]]) -> None:
-        trimmed = history[-self._max_length :]
-        self._table.upsert(
-            {"email": email, "history": trimmed},
-            self._query.email == email,
-        )
+    def _migrate_legacy_records(self) -> None:
+        """Re-key records written with auto-increment ids (one scan at startup)."""
 
-    def close(self) -> None:
-        """Close the underlying TinyDB instance."""
+        legacy_ids: list[int] = []
+        for record in self._table.all():
+            email = record.get("email")
+            if not isinstance(email, str):
+                continue
+            doc_id = self._doc_id(email)
+            if record.doc_id == doc_id:
+                continue
+            if not self._table.contains(doc_id=doc_id):
+                self._table.insert(Document(dict(record), doc_id=doc_id))
+            legacy_ids.append(record.doc_id)
+
+        if not legacy_ids:
+            return
+
+        self._table.remove(doc_ids=legacy_ids)
+        self._storage.flush()  # type: ignore[no-untyped-call]
+        if self._logger is not None:
+            self._logger.info("re-keyed %s legacy history records", len(legacy_ids))
+
+    @staticmethod
+    def _doc_id(email: str) -> int:
+        return _doc_id_for(email)
 
-        self._db.close()
+    def _remember(self, email: str, history: list[dict[str, Any]]) -> None:
+        if not self._cache_size:
+            return
+        self._cache[email] = history
+        self._cache.move_to_end(email)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
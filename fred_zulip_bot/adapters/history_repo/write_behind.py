@@ -0,0 +1,98 @@
+"""Write-behind wrapper that moves history persistence off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any
+
+from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+
+
+class WriteBehindHistoryRepo(HistoryRepository):
+    """Acknowledge saves immediately and persist them on a worker thread.
+
+    A chat turn saves history several times; with this wrapper each save only records
+    the latest value and schedules one background writer per email. Saves that arrive
+    while a write is in flight are coalesced, so at most one write per email runs at a
+    time and the newest value always wins. Reads see pending values before they reach
+    the store. With ``delay`` set, each write waits that long first, so bursts of saves
+    (a turn's message and reply, or several quick messages) land as one write.
+
+    Calls into the wrapped repository are serialized with a lock, so repositories that
+    are not thread-safe (TinyDB) can be wrapped. Outside a running event loop, saves are
+    written through synchronously.
+    """
+
+    def __init__(
+        self,
+        inner: HistoryRepository,
+        *,
+        logger: Any | None = None,
+        delay: float = 0.0,
+    ) -> None:
+        self._inner = inner
+        self._logger = logger
+        self._delay = delay
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[dict[str, Any]]] = {}
+        self._writers: dict[str, asyncio.Task[None]] = {}
+
+    def get(self, email: str) -> list[dict[str, Any]]:
+        pending = self._pending.get(email)
+        if pending is not None:
+            return list(pending)
+        with self._lock:
+            return self._inner.get(email)
+
+    def save(self, email: str, history: list[dict[str, Any]]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(email, history)
+            return
+
+        self._pending[email] = list(history)
+        if email not in self._writers:
+            self._writers[email] = loop.create_task(self._drain(email))
+
+    async def aget(self, email: str) -> list[dict[str, Any]]:
+        pending = self._pending.get(email)
+        if pending is not None:
+            return list(pending)
+        return await asyncio.to_thread(self.get, email)
+
+    async def asave(self, email: str, history: list[dict[str, Any]]) -> None:
+        # Already non-blocking: only records the value and schedules the writer.
+        self.save(email, history)
+
+    async def aclose(self) -> None:
+        """Wait for pending writes, then close the wrapped repository."""
+
+        while self._writers:
+            await asyncio.gather(*self._writers.values(), return_exceptions=True)
+        close = getattr(self._inner, "close", None)
+        if callable(close):
+            with self._lock:
+                close()
+
+    async def _drain(self, email: str) -> None:
+        try:
+            while email in self._pending:
+                if self._delay > 0:
+                    await asyncio.sleep(self._delay)
+                history = self._pending[email]
+                try:
+                    await asyncio.to_thread(self._write, email, history)
+                except Exception:
+                    if self._logger is not None:
+                        self._logger.error("History save failed for %s", email, exc_info=True)
+                # Only clear the slot if no newer save arrived during the write.
+                if self._pending.get(email) is history:
+                    del self._pending[email]
+        finally:
+            self._writers.pop(email, None)
+
+    def _write(self, email: str, history: list[dict[str, Any]]) -> None:
+        with self._lock:
+            self._inner.save(email, history)
@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import asyncio
+import re
+import threading
+from contextlib import closing
 from importlib import import_module
 from typing import Any
 
@@ -10,9 +14,38 @@ try:
 except ModuleNotFoundError as exc:  # pragma: no cover - hard dependency
     raise RuntimeError("mysql-connector-python is required to use MySqlClient") from exc
 
+FETCH_BATCH_SIZE = 1000
+
+# A LIMIT clause closing the statement, e.g. "LIMIT 10", "LIMIT 5, 10", "LIMIT 10 OFFSET 5".
+_TRAILING_LIMIT = re.compile(
+    r"\blimit\s+\d+(?:\s*(?:,|\boffset\b)\s*\d+)?\s*$",
+    re.IGNORECASE,
+)
+
+
+def with_row_limit(sql: str, limit: int) -> str:
+    """Append ``LIMIT limit`` to ``sql`` unless the statement already ends with a LIMIT."""
+
+    statement = sql.strip().rstrip(";").rstrip()
+    if _TRAILING_LIMIT.search(statement):
+        return statement
+    return f"{statement} LIMIT {limit}"
+
 
 class MySqlClient:
-    """Execute read-only queries against the configured database."""
+    """Execute read-only queries against the configured database.
+
+    Connections come from a ``MySQLConnectionPool`` created on first use, so each query
+    reuses an authenticated connection instead of paying the TCP/TLS/auth handshake.
+    ``aselect`` runs the query on a worker thread and admits at most ``pool_size`` queries
+    at once, since the pool raises instead of waiting when it is exhausted.
+
+    Results are capped at ``max_rows`` rows and ``max_chars`` characters: the text is only
+    ever fed back to the model, and a huge result set costs tokens without improving the
+    answer. Statements without
+    their own LIMIT get one appended, so the server stops producing rows past the cap
+    instead of streaming them over the wire to be discarded.
+    """
 
     def __init__(
         self,
@@ -22,6 +55,9 @@ class MySqlClient:
         user: str,
         password: str,
         port: int = 3306,
+        pool_size: int = 5,
+        max_rows: int = 200,
+        max_chars: int = 20_000,
         logger: Any | None = None,
     ) -> None:
         self._host = host
@@ -29,31 +65,87 @@ class MySqlClient:
         self._user = user
         self._password = password
         self._port = port
+        self._pool_size = pool_size
+        self._max_rows = max(max_rows, 1)
+        self._max_chars = max(max_chars, 1)
         self._logger = logger
+        self._pool: Any | None = None
+        self._pool_lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max(pool_size, 1))
+
+    async def aselect(self, sql: str) -> str:
+        """Run ``select`` off the event loop, waiting for a free pooled connection."""
+
+        async with self._slots:
+            return await asyncio.to_thread(self.select, sql)
 
     def select(self, sql: str) -> str:
         try:
-            conn = MYSQL_CONNECTOR.connect(
-                host=self._host,
-                port=self._port,
-                database=self._database,
-                user=self._user,
-                password=self._password,
-                charset="utf8mb4",
-                collation="utf8mb4_unicode_ci",
-            )
-
-            cursor = conn.cursor()
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            result = ""
-            for row in rows:
-                result += f"{row}, "
-
-            cursor.close()
-            conn.close()
-            return result
+            # Closing a pooled connection hands it back to the pool.
+            with (
+                closing(self._get_pool().get_connection()) as conn,
+                closing(conn.cursor()) as cursor,
+            ):
+                # One row past the cap tells us whether anything was cut off.
+                cursor.execute(with_row_limit(sql, self._max_rows + 1))
+                parts: list[str] = []
+                size = 0
+                truncated = False
+                remaining = self._max_rows + 1
+                while (
+                    not truncated
+                    and remaining
+                    and (batch := cursor.fetchmany(min(FETCH_BATCH_SIZE, remaining)))
+                ):
+                    remaining -= len(batch)
+                    for row in batch:
+                        text = f"{row}, "
+                        size += len(text)
+                        if len(parts) == self._max_rows or size > self._max_chars:
+                            if not parts:
+                                # A single oversized row still gives the model something.
+                                parts.append(f"{text[: self._max_chars]}, ")
+                            truncated = True
+                            break
+                        parts.append(text)
+
+            if truncated:
+                parts.append(f"(truncated to the first {len(parts)} rows)")
+            return "".join(parts)
         except Exception:
             if self._logger is not None:
                 self._logger.error("invalid sql generated", exc_info=True)
             return "salvage"
+
+    def close(self) -> None:
+        """Close the pooled connections; a later query builds a fresh pool."""
+
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # The pool has no public shutdown; this closes every idle connection it holds.
+            pool._remove_connections()
+
+    async def aclose(self) -> None:
+        """Run ``close`` off the event loop; each connection says goodbye to the server."""
+
+        await asyncio.to_thread(self.close)
+
+    def _get_pool(self) -> Any:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = MYSQL_CONNECTOR.pooling.MySQLConnectionPool(
+                        pool_name="fred",
+                        pool_size=self._pool_size,
+                        host=self._host,
+                        port=self._port,
+                        database=self._database,
+                        user=self._user,
+                        password=self._password,
+                        charset="utf8mb4",
+                        collation="utf8mb4_unicode_ci",
+                        # Discard rows left unread after truncation when the cursor closes.
+                        consume_results=True,
+                    )
+        return self._pool
@@ -3,20 +3,45 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from importlib.util import find_spec
 from typing import Any
 
-import requests
+import httpx
+
+SEND_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+SEND_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+# HTTP/2 needs the optional ``h2`` package (``httpx[http2]``); fall back to HTTP/1.1 without it.
+HTTP2_AVAILABLE = find_spec("h2") is not None
 
 
 class ZulipClient:
-    """Minimal wrapper around the Zulip messages API."""
+    """Minimal async wrapper around the Zulip messages API.
+
+    Sends share one ``httpx.AsyncClient`` so keep-alive connections to the realm are
+    reused and concurrent sends overlap on the event loop instead of holding a worker
+    thread each. Over HTTP/2 the ack, progress updates and replies of concurrent chats
+    are multiplexed on a single connection.
+    """
 
-    def __init__(self, realm_url: str, email: str, api_key: str) -> None:
+    def __init__(
+        self,
+        realm_url: str,
+        email: str,
+        api_key: str,
+        *,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
         self._realm_url = realm_url.rstrip("/")
-        self._email = email
-        self._api_key = api_key
+        # Sending a message is not idempotent, so only connection failures are retried.
+        self._client = httpx.AsyncClient(
+            auth=(email, api_key),
+            timeout=SEND_TIMEOUT,
+            limits=SEND_LIMITS,
+            transport=transport
+            or httpx.AsyncHTTPTransport(retries=3, limits=SEND_LIMITS, http2=HTTP2_AVAILABLE),
+        )
 
-    def send(
+    async def send(
         self,
         *,
         to: Iterable[str],
@@ -24,7 +49,9 @@ class ZulipClient:
         subject: str,
         content: str,
         channel_name: Any,
-    ) -> None:
+    ) -> int | None:
+        """Send a message and return its Zulip id, if the server reported one."""
+
         payload: dict[str, Any] = {
             "type": msg_type,
             "to": list(to),
@@ -34,9 +61,21 @@ class ZulipClient:
             payload["subject"] = subject
             payload["to"] = channel_name
 
-        requests.post(
-            f"{self._realm_url}/api/v1/messages",
-            data=payload,
-            auth=(self._email, self._api_key),
-            timeout=10,
+        response = await self._client.post(f"{self._realm_url}/api/v1/messages", data=payload)
+        try:
+            message_id = response.json().get("id")
+        except ValueError:
+            return None
+        return message_id if isinstance(message_id, int) else None
+
+    async def update(self, message_id: int, content: str) -> None:
+        """Replace the content of a previously sent message."""
+
+        await self._client.patch(
+            f"{self._realm_url}/api/v1/messages/{message_id}",
+            data={"content": content},
         )
+
+    async def aclose(self) -> None:
+        """Release pooled connections."""
+        await self._client.aclose()
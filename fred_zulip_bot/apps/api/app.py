@@ -2,28 +2,53 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from functools import cached_property
 from pathlib import Path
 from typing import Any
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from config import config
+from config import Config, get_settings
+from fred_zulip_bot.adapters.gemini_context_cache import GeminiContextCache
 from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+from fred_zulip_bot.adapters.history_repo.sqlite_repo import SqliteHistoryRepo
 from fred_zulip_bot.adapters.history_repo.tinydb_repo import TinyDbHistoryRepo
+from fred_zulip_bot.adapters.history_repo.write_behind import WriteBehindHistoryRepo
 from fred_zulip_bot.adapters.mysql_client import MySqlClient
 from fred_zulip_bot.adapters.zulip_client import ZulipClient
 from fred_zulip_bot.apps.api.routes.chat import register_chat_routes
 from fred_zulip_bot.apps.api.routes.health import register_health_routes
 from fred_zulip_bot.services.chat_service import ChatService
+from fred_zulip_bot.services.faq_index import FaqIndex
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.model_gateway import ModelGateway
+from fred_zulip_bot.services.query_service import QueryService
+from fred_zulip_bot.services.reply_writers import (
+    DirectReplyWriter,
+    ReplyWriter,
+    StreamingReplyWriter,
+)
+from fred_zulip_bot.services.semantic_cache import SemanticCache
 from fred_zulip_bot.services.sql_service import SqlService
+from fred_zulip_bot.services.zulip_delivery import ZulipDelivery
 from logger import logger
 
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application instance."""
 
-    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None, title="fred-zulip-bot")
+    app = FastAPI(
+        docs_url=None,
+        redoc_url=None,
+        openapi_url=None,
+        title="fred-zulip-bot",
+        lifespan=_lifespan,
+    )
 
     app.add_middleware(
         CORSMiddleware,
@@ -32,8 +57,7 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    services = _build_services()
-    app.state.services = services
+    app.state.services = ServiceRegistry(get_settings())
     app.state.logger = logger
 
     register_chat_routes(app)
@@ -42,55 +66,237 @@ def create_app() -> FastAPI:
     return app
 
 
-def _build_services() -> dict[str, Any]:
-    max_length = config.HISTORY_MAX_LENGTH
-    sql_service = SqlService()
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await _warm_services(app.state.services)
+    yield
+    await _close_services(app.state.services)
 
-    history_repo: HistoryRepository = TinyDbHistoryRepo(
-        Path(config.HISTORY_DB_PATH),
-        max_length=max_length,
-        logger=logger,
-    )
 
-    if config.TEST_MODE:
-        zulip_email = config.ZULIP_BOT_EMAIL_TEST or config.ZULIP_BOT_EMAIL
-        zulip_token = config.ZULIP_BOT_TOKEN_TEST or config.ZULIP_BOT_TOKEN
-        auth_token = config.ZULIP_AUTH_TOKEN_TEST or config.ZULIP_AUTH_TOKEN
-    else:
-        zulip_email = config.ZULIP_BOT_EMAIL
-        zulip_token = config.ZULIP_BOT_TOKEN
-        auth_token = config.ZULIP_AUTH_TOKEN
-
-    zulip_client = ZulipClient(
-        realm_url=config.ZULIP_SITE,
-        email=zulip_email,
-        api_key=zulip_token,
-    )
+async def _warm_services(services: ServiceRegistry) -> None:
+    faq_index = services.faq_index
+    if faq_index is None:
+        return
+    # Embedding the FAQ questions is a series of blocking API calls; doing it here keeps
+    # the first chatbot message from paying for it.
+    try:
+        await asyncio.to_thread(faq_index.build, services.gemini_client.embed)
+    except Exception:
+        logger.error("FAQ index build failed; answering without it", exc_info=True)
+        return
+    logger.info("FAQ index built entries=%s", len(faq_index))
 
-    mysql_client = MySqlClient(
-        host=config.DB_HOST,
-        database=config.DB_NAME,
-        user=config.DB_USER,
-        password=config.DB_PASSWORD,
-        logger=logger,
-    )
 
-    chat_service = ChatService(
-        zulip_client=zulip_client,
-        history_repo=history_repo,
-        mysql_client=mysql_client,
-        sql_service=sql_service,
-        auth_token=auth_token,
-        logger=logger,
-        api_key=config.GENAI_API_KEY,
-        enable_langgraph=config.ENABLE_LANGGRAPH,
-        history_max_length=max_length,
+async def _close_services(services: ServiceRegistry) -> None:
+    history_repo = services.get_if_built("history_repo")
+    history_aclose = getattr(history_repo, "aclose", None)
+    history_close = getattr(history_repo, "close", None)
+    try:
+        if callable(history_aclose):
+            await history_aclose()
+        elif callable(history_close):
+            history_close()
+    except Exception:
+        logger.error("History repository close failed", exc_info=True)
+
+    mysql_client = services.get_if_built("mysql_client")
+    mysql_aclose = getattr(mysql_client, "aclose", None)
+    if callable(mysql_aclose):
+        try:
+            await mysql_aclose()
+        except Exception:
+            logger.error("MySQL pool close failed", exc_info=True)
+
+    zulip_aclose = getattr(services.get_if_built("zulip_client"), "aclose", None)
+    if callable(zulip_aclose):
+        try:
+            await zulip_aclose()
+        except Exception:
+            logger.error("Zulip client close failed", exc_info=True)
+
+
+class ServiceRegistry:
+    """Build application services on first access.
+
+    Unless an FAQ corpus is configured (its index is embedded at startup), nothing is
+    constructed before the first request, so processes that only answer health probes never
+    open the history store or create API clients. Each service is built once and cached;
+    item access (``services["chat_service"]``) is kept for route handlers.
+    """
+
+    _NAMES = frozenset(
+        {
+            "chat_service",
+            "faq_index",
+            "gemini_client",
+            "history_repo",
+            "model_gateway",
+            "mysql_client",
+            "query_service",
+            "zulip_client",
+            "zulip_delivery",
+            "sql_service",
+        }
     )
 
-    return {
-        "chat_service": chat_service,
-        "history_repo": history_repo,
-        "mysql_client": mysql_client,
-        "zulip_client": zulip_client,
-        "sql_service": sql_service,
-    }
+    def __init__(self, config: Config) -> None:
+        self._config = config
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._NAMES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._NAMES
+
+    def get_if_built(self, name: str) -> Any | None:
+        """Return the service if it has been constructed, without building it."""
+
+        return self.__dict__.get(name) if name in self._NAMES else None
+
+    @cached_property
+    def sql_service(self) -> SqlService:
+        return SqlService()
+
+    @cached_property
+    def history_repo(self) -> HistoryRepository:
+        config = self._config
+        repo: HistoryRepository
+        if config.HISTORY_BACKEND == "sqlite":
+            repo = SqliteHistoryRepo(
+                Path(config.HISTORY_SQLITE_PATH),
+                max_length=config.HISTORY_MAX_LENGTH,
+                logger=logger,
+            )
+        else:
+            repo = TinyDbHistoryRepo(
+                Path(config.HISTORY_DB_PATH),
+                max_length=config.HISTORY_MAX_LENGTH,
+                flush_interval=config.HISTORY_FLUSH_INTERVAL_SECONDS,
+                logger=logger,
+            )
+        if config.HISTORY_WRITE_BEHIND:
+            return WriteBehindHistoryRepo(
+                repo, logger=logger, delay=config.HISTORY_WRITE_DELAY_SECONDS
+            )
+        return repo
+
+    @cached_property
+    def zulip_client(self) -> ZulipClient:
+        config = self._config
+        return ZulipClient(
+            realm_url=config.ZULIP_SITE,
+            email=config.effective_zulip_email,
+            api_key=config.effective_zulip_token,
+        )
+
+    @cached_property
+    def mysql_client(self) -> MySqlClient:
+        config = self._config
+        return MySqlClient(
+            host=config.DB_HOST,
+            database=config.DB_NAME,
+            user=config.DB_USER,
+            password=config.DB_PASSWORD,
+            pool_size=config.DB_POOL_SIZE,
+            max_rows=config.DB_MAX_ROWS,
+            max_chars=config.DB_MAX_RESULT_CHARS,
+            logger=logger,
+        )
+
+    @cached_property
+    def faq_index(self) -> FaqIndex | None:
+        config = self._config
+        if not config.FAQ_PATH:
+            return None
+        return FaqIndex.from_json(Path(config.FAQ_PATH), threshold=config.FAQ_THRESHOLD)
+
+    @cached_property
+    def gemini_client(self) -> GeminiClient:
+        config = self._config
+        return GeminiClient(
+            api_key=config.GENAI_API_KEY,
+            context_cache=(
+                GeminiContextCache(
+                    ttl=timedelta(seconds=config.GEMINI_CONTEXT_CACHE_TTL_SECONDS),
+                    logger=logger,
+                )
+                if config.GEMINI_CONTEXT_CACHE
+                else None
+            ),
+            cached_prompt=self.sql_service.sql_prompt,
+            cached_prompt_digest=self.sql_service.sql_prompt_digest,
+        )
+
+    @cached_property
+    def model_gateway(self) -> ModelGateway:
+        config = self._config
+        return ModelGateway(
+            gemini=self.gemini_client,
+            history_repo=self.history_repo,
+            logger=logger,
+            model_history_turns=config.GEMINI_HISTORY_TURNS,
+            response_cache_size=config.GEMINI_RESPONSE_CACHE_SIZE,
+            response_cache_ttl_seconds=config.GEMINI_RESPONSE_CACHE_TTL_SECONDS or None,
+        )
+
+    @cached_property
+    def zulip_delivery(self) -> ZulipDelivery:
+        return ZulipDelivery(zulip_client=self.zulip_client, logger=logger)
+
+    @cached_property
+    def query_service(self) -> QueryService:
+        config = self._config
+        return QueryService(
+            models=self.model_gateway,
+            delivery=self.zulip_delivery,
+            mysql_client=self.mysql_client,
+            sql_service=self.sql_service,
+            answer_writer=self._reply_writer(stream=config.STREAM_ANSWERS),
+            logger=logger,
+            history_max_length=config.HISTORY_MAX_LENGTH,
+            sql_cache_size=config.SQL_CACHE_SIZE,
+            sql_cache_ttl_seconds=config.SQL_CACHE_TTL_SECONDS,
+            db_result_cache_size=config.DB_RESULT_CACHE_SIZE,
+            db_result_cache_ttl_seconds=config.DB_RESULT_CACHE_TTL_SECONDS,
+        )
+
+    @cached_property
+    def chat_service(self) -> ChatService:
+        config = self._config
+        return ChatService(
+            history_repo=self.history_repo,
+            delivery=self.zulip_delivery,
+            models=self.model_gateway,
+            queries=self.query_service,
+            reply_writer=self._reply_writer(stream=config.STREAM_SMALL_TALK),
+            embed=self.gemini_client.embed,
+            auth_token=config.effective_auth_token,
+            logger=logger,
+            enable_langgraph=config.ENABLE_LANGGRAPH,
+            intent_model=config.GEMINI_INTENT_MODEL,
+            chat_model=config.GEMINI_CHAT_MODEL,
+            intent_retry_window_seconds=config.INTENT_RETRY_WINDOW_SECONDS,
+            intent_cache=(
+                SemanticCache(threshold=config.INTENT_SEMANTIC_THRESHOLD)
+                if config.INTENT_SEMANTIC_CACHE
+                else None
+            ),
+            chatbot_cache=(
+                SemanticCache(threshold=config.CHATBOT_SEMANTIC_THRESHOLD)
+                if config.CHATBOT_SEMANTIC_CACHE
+                else None
+            ),
+            faq_index=self.faq_index,
+        )
+
+    def _reply_writer(self, *, stream: bool) -> ReplyWriter:
+        if not stream:
+            return DirectReplyWriter(self.model_gateway)
+        return StreamingReplyWriter(
+            models=self.model_gateway,
+            gemini=self.gemini_client,
+            delivery=self.zulip_delivery,
+            logger=logger,
+        )
@@ -14,7 +14,7 @@ if TYPE_CHECKING:
 router: APIRouter = APIRouter()
 
 
-def chat_endpoint(
+async def chat_endpoint(
     request: ChatRequest,
     background_tasks: BackgroundTasks,
     http_request: Request,
@@ -25,7 +25,7 @@ def chat_endpoint(
         "ChatService",
         http_request.app.state.services["chat_service"],
     )
-    return chat_service.handle_chat_request(request, background_tasks)
+    return await chat_service.handle_chat_request(request, background_tasks)
 
 
 def register_chat_routes(app: FastAPI) -> None:
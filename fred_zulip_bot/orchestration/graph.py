@@ -17,25 +17,27 @@ except ModuleNotFoundError as exc:  # pragma: no cover - hard dependency
 END: Any = LANGGRAPH_GRAPH.END
 StateGraph: Any = LANGGRAPH_GRAPH.StateGraph
 
+_INTENT_VALUES: frozenset[str] = frozenset(item.value for item in IntentType)
+
 
 class ChatGraphService(Protocol):
     """Interface required by the LangGraph orchestration builder."""
 
-    def classify_intent(self, message: ZulipMessage) -> IntentType: ...
+    async def classify_intent(self, message: ZulipMessage) -> IntentType: ...
 
-    def converse_with_fred_bot(
+    async def converse_with_fred_bot(
         self,
         message: ZulipMessage,
         history: list[dict[str, Any]],
     ) -> str: ...
 
-    def handle_unsupported_function(
+    async def handle_unsupported_function(
         self,
         message: ZulipMessage,
         history: list[dict[str, Any]],
     ) -> str: ...
 
-    def query_fred(
+    async def query_fred(
         self,
         message: ZulipMessage,
         history: list[dict[str, Any]],
@@ -56,17 +58,20 @@ class GraphState(TypedDict, total=False):
 class GraphRunner(Protocol):
     """Subset of the LangGraph runner interface used by the chat service."""
 
-    def invoke(self, state: GraphState) -> GraphState: ...
+    async def ainvoke(self, state: GraphState) -> GraphState: ...
 
 
 def build_chat_graph(*, chat_service: ChatGraphService, logger: Any) -> GraphRunner:
-    """Return a compiled LangGraph that mirrors the legacy chat flow."""
+    """Return a compiled LangGraph that mirrors the legacy chat flow.
+
+    Nodes are coroutines, so the compiled graph must be driven with ``ainvoke``.
+    """
 
     graph = StateGraph(GraphState)
 
-    def classify_intent(state: GraphState) -> dict[str, Any]:
+    async def classify_intent(state: GraphState) -> dict[str, Any]:
         request = state["request"]
-        intent = chat_service.classify_intent(request.message)
+        intent = await chat_service.classify_intent(request.message)
         logger.info("LangGraph node=classify_intent_node intent=%s", intent.value)
         return {"intent": intent}
 
@@ -76,34 +81,34 @@ def build_chat_graph(*, chat_service: ChatGraphService, logger: Any) -> GraphRun
             return intent.value
         if isinstance(intent, str):
             cleaned = intent.strip().lower()
-            if cleaned in {item.value for item in IntentType}:
+            if cleaned in _INTENT_VALUES:
                 return cleaned
         return IntentType.HANDLE_UNSUPPORTED_FUNCTION.value
 
-    def converse_with_fred_bot(state: GraphState) -> dict[str, Any]:
+    async def converse_with_fred_bot(state: GraphState) -> dict[str, Any]:
         request = state["request"]
         history = state["history"]
-        response = chat_service.converse_with_fred_bot(request.message, history)
+        response = await chat_service.converse_with_fred_bot(request.message, history)
         logger.info(
             "LangGraph node=converse_with_fred_bot response_chars=%s",
             len(response or ""),
         )
         return {"response": response}
 
-    def handle_unsupported_function(state: GraphState) -> dict[str, Any]:
+    async def handle_unsupported_function(state: GraphState) -> dict[str, Any]:
         request = state["request"]
         history = state["history"]
-        response = chat_service.handle_unsupported_function(request.message, history)
+        response = await chat_service.handle_unsupported_function(request.message, history)
         logger.info(
             "LangGraph node=handle_unsupported_function response_chars=%s",
             len(response or ""),
         )
         return {"response": response}
 
-    def query_fred(state: GraphState) -> dict[str, Any]:
+    async def query_fred(state: GraphState) -> dict[str, Any]:
         request = state["request"]
         history = state["history"]
-        response, sql_text, result_text = chat_service.query_fred(
+        response, sql_text, result_text = await chat_service.query_fred(
             request.message,
             history,
         )
@@ -0,0 +1,55 @@
+"""Curated FAQ answers matched by embedding similarity."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from fred_zulip_bot.services.semantic_cache import SemanticCache
+
+
+class FaqIndex:
+    """Answer common small-talk questions from a curated list instead of the model.
+
+    The questions are embedded once, at startup, into a ``SemanticCache`` sized to hold
+    all of them; a lookup is then a single dot-product scan. The corpus is a JSON list of
+    ``{"question": ..., "answer": ...}`` objects.
+    """
+
+    def __init__(self, entries: Sequence[tuple[str, str]], *, threshold: float = 0.9) -> None:
+        self._entries = tuple(entries)
+        self._cache: SemanticCache[str] = SemanticCache(
+            threshold=threshold, max_entries=len(self._entries)
+        )
+        self._built = False
+
+    @classmethod
+    def from_json(cls, path: Path, *, threshold: float = 0.9) -> FaqIndex:
+        raw: list[dict[str, Any]] = orjson.loads(path.read_bytes())
+        return cls(
+            [(str(item["question"]), str(item["answer"])) for item in raw],
+            threshold=threshold,
+        )
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self, embed: Callable[[str], list[float]]) -> None:
+        """Embed every question; blocking, so callers run it off the event loop."""
+
+        for question, answer in self._entries:
+            self._cache.add(embed(question), answer)
+        self._built = True
+
+    def lookup(self, embedding: Sequence[float]) -> str | None:
+        return self._cache.lookup(embedding)
+
+    async def alookup(self, embedding: Sequence[float]) -> str | None:
+        return await self._cache.alookup(embedding)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,225 @@
+"""Gemini model access: model construction, per-call deadlines, retries and streaming."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import google.generativeai as genai
+import orjson
+from google.api_core.retry import AsyncRetry, if_transient_error
+
+from fred_zulip_bot.adapters.gemini_context_cache import GeminiContextCache
+from fred_zulip_bot.services.response_cache import LruCache
+
+# Prompts and generation configs form a small closed set, so few models are ever live.
+_MODEL_POOL_SIZE = 32
+# Per-request deadline for Gemini calls; transient failures (429/500/503) are retried with
+# backoff inside each model attempt before the caller falls back to the next model.
+_GEMINI_TIMEOUT_SECONDS = 30.0
+_GEMINI_RETRY = AsyncRetry(
+    predicate=if_transient_error, initial=1.0, maximum=8.0, multiplier=2.0, timeout=30.0
+)
+
+
+class GeminiClient:
+    """Make single Gemini calls: one model, one prompt, one attempt with retries.
+
+    ``GenerativeModel`` instances are pooled per (model, prompt, config). When a context
+    cache is given, ``cached_prompt`` (the schema-heavy SQL prompt) is served from it; the
+    other prompts are far below Gemini's minimum cacheable size.
+    """
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        embedding_model: str = "models/text-embedding-004",
+        context_cache: GeminiContextCache | None = None,
+        cached_prompt: str | None = None,
+        cached_prompt_digest: str | None = None,
+        retry: AsyncRetry = _GEMINI_RETRY,
+    ) -> None:
+        self._embedding_model = embedding_model
+        self._context_cache = context_cache
+        self._cached_prompt = cached_prompt
+        self._cached_prompt_digest = cached_prompt_digest
+        self._retry = retry
+        # _create_model can run in a worker thread when the context cache is in play, hence
+        # the lock.
+        self._model_pool: LruCache[tuple[str, str, bytes], Any] = LruCache(_MODEL_POOL_SIZE)
+        self._model_pool_lock = threading.Lock()
+
+        self._configure_genai(api_key)
+
+    async def generate(
+        self,
+        *,
+        model_name: str,
+        prompt: str,
+        content: str,
+        history: list[dict[str, Any]] | None,
+        generation_config: dict[str, Any] | None = None,
+    ) -> Any:
+        """Return the full response, retrying transient errors within the retry deadline."""
+
+        return await self._retry(self._generate)(
+            model_name=model_name,
+            prompt=prompt,
+            content=content,
+            history=history,
+            generation_config=generation_config,
+        )
+
+    async def stream(
+        self,
+        *,
+        model_name: str,
+        prompt: str,
+        content: str,
+        history: list[dict[str, Any]] | None,
+    ) -> AsyncIterator[str]:
+        """Yield the reply text as Gemini produces it."""
+
+        # The SDK waits for the first chunk before returning the stream, so retrying the
+        # open covers transient errors up to the first piece of text.
+        response = await self._retry(self._open_stream)(
+            model_name=model_name, prompt=prompt, content=content, history=history
+        )
+        async for chunk in response:
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Chunks without text parts, such as a trailing finish-reason chunk.
+                continue
+            if piece:
+                yield piece
+
+    def embed(self, text: str) -> list[float]:
+        """Embed ``text`` for similarity lookups; blocking, so run it off the event loop."""
+
+        embed = getattr(genai, "embed_content", None)
+        if not callable(embed):  # pragma: no cover - defensive guard
+            raise RuntimeError("google.generativeai.embed_content is unavailable")
+
+        result = embed(
+            model=self._embedding_model,
+            content=text,
+            task_type="semantic_similarity",
+        )
+        return [float(value) for value in result["embedding"]]
+
+    async def _generate(
+        self,
+        *,
+        model_name: str,
+        prompt: str,
+        content: str,
+        history: list[dict[str, Any]] | None,
+        generation_config: dict[str, Any] | None,
+    ) -> Any:
+        model = await self._model_for_call(model_name, prompt, generation_config)
+        request_options = {"timeout": _GEMINI_TIMEOUT_SECONDS}
+        # The SDK's native async calls wait on the event loop instead of a worker thread.
+        if history:
+            chat_session: Any = model.start_chat(history=history)
+            return await chat_session.send_message_async(content, request_options=request_options)
+        return await model.generate_content_async(content, request_options=request_options)
+
+    async def _open_stream(
+        self,
+        *,
+        model_name: str,
+        prompt: str,
+        content: str,
+        history: list[dict[str, Any]] | None,
+    ) -> Any:
+        model = await self._model_for_call(model_name, prompt, None)
+        request_options = {"timeout": _GEMINI_TIMEOUT_SECONDS}
+        if history:
+            chat_session: Any = model.start_chat(history=history)
+            return await chat_session.send_message_async(
+                content, stream=True, request_options=request_options
+            )
+        return await model.generate_content_async(
+            content, stream=True, request_options=request_options
+        )
+
+    async def _model_for_call(
+        self,
+        model_name: str,
+        prompt: str,
+        generation_config: dict[str, Any] | None,
+    ) -> Any:
+        if self._uses_context_cache(prompt):
+            # Creating or refreshing the context cache is a blocking API call.
+            return await asyncio.to_thread(
+                self._create_model,
+                model_name=model_name,
+                prompt=prompt,
+                generation_config=generation_config,
+            )
+        return self._create_model(
+            model_name=model_name,
+            prompt=prompt,
+            generation_config=generation_config,
+        )
+
+    def _uses_context_cache(self, prompt: str) -> bool:
+        return self._context_cache is not None and prompt == self._cached_prompt
+
+    def _configure_genai(self, api_key: str) -> None:
+        _configure_genai_once(api_key)
+
+    def _create_model(
+        self,
+        *,
+        model_name: str,
+        prompt: str,
+        generation_config: dict[str, Any] | None = None,
+    ) -> Any:
+        if self._context_cache is not None and self._uses_context_cache(prompt):
+            cached_model = self._context_cache.model_for(
+                model_name=model_name,
+                system_instruction=prompt,
+                generation_config=generation_config,
+                content_digest=self._cached_prompt_digest,
+            )
+            if cached_model is not None:
+                return cached_model
+
+        factory_candidate = getattr(genai, "GenerativeModel", None)
+        if not callable(factory_candidate):  # pragma: no cover - defensive guard
+            raise RuntimeError("google.generativeai.GenerativeModel is unavailable")
+
+        factory: Callable[..., Any] = factory_candidate
+        # Prompt strings are long-lived constants, so key lookups hit the cached str hash.
+        pool_key = (
+            model_name,
+            prompt,
+            orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS),
+        )
+        with self._model_pool_lock:
+            model = self._model_pool.get(pool_key)
+            if model is None:
+                model = factory(
+                    model_name=model_name,
+                    system_instruction=prompt,
+                    generation_config=generation_config,
+                )
+                self._model_pool.put(pool_key, model)
+        return model
+
+
+@functools.lru_cache(maxsize=1)
+def _configure_genai_once(api_key: str) -> None:
+    # configure() resets the SDK's process-wide clients, so repeating it with the same key
+    # would only throw away connections that are already open.
+    configure = getattr(genai, "configure", None)
+    if not callable(configure):  # pragma: no cover - defensive guard
+        raise RuntimeError("google.generativeai.configure is unavailable")
+
+    configure(api_key=api_key)
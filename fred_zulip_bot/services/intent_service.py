@@ -2,12 +2,14 @@
 
 from __future__ import annotations
 
+import re
+from collections.abc import Awaitable
 from enum import Enum
 from typing import Protocol
 
 
 class _AskFn(Protocol):
-    def __call__(self, prompt: str, use_history: bool) -> object: ...
+    def __call__(self, prompt: str, use_history: bool) -> Awaitable[object]: ...
 
 
 class IntentType(str, Enum):
@@ -48,16 +50,53 @@ OTHER_PROMPT = (
     "language. The user has asked something of you that is an unsupported function of this chatbot. Kindly explain"
     "to the user that you can't help them with that, and redirect them by informing them of things you can do."
 )
+
 PROMPTS_BY_INTENT = {
     IntentType.CONVERSE_WITH_FRED_BOT: CHATBOT_PROMPT,
     IntentType.HANDLE_UNSUPPORTED_FUNCTION: OTHER_PROMPT,
 }
 
 
-def classify_intent(ask_fn: _AskFn) -> IntentType:
+# Data questions phrased so plainly that no model is needed to recognise them: a counting or
+# listing lead-in plus an entity the database tracks, and no reference to the bot itself.
+_FASTPATH_LEAD_IN = re.compile(
+    r"^\s*(?:how\s+many|list|count|show\s+me|which|what\s+(?:is|are)\s+the\s+(?:number|total))\b",
+    re.IGNORECASE,
+)
+_FASTPATH_ENTITY = re.compile(
+    r"\b(?:projects?|languages?|countr(?:y|ies)|books?|chapters?|verses?|translations?|"
+    r"engagements?|resources?|organi[sz]ations?|partners?|people\s+groups?|upgs?|"
+    r"portfolios?|programs?|training\s+events?|populations?|regions?)\b",
+    re.IGNORECASE,
+)
+_FASTPATH_SELF = re.compile(r"\b(?:you|your|yourself|fred)\b", re.IGNORECASE)
+# Questions about the bot itself, matched against the whole message so that data questions
+# that merely open with one of these phrases ("what can you do for Kenya?") still go to the
+# model.
+_FASTPATH_CHATBOT = re.compile(
+    r"\s*(?:what(?:['\u2019]s|\s+is)\s+your\s+name|who\s+are\s+you|what\s+are\s+you|"
+    r"what\s+(?:can|do)\s+you\s+do|how\s+do\s+you\s+work|who\s+(?:built|made|created)\s+you)"
+    r"\s*[?.!]*\s*",
+    re.IGNORECASE,
+)
+
+
+def fast_classify(text: str) -> IntentType | None:
+    """Return the intent of unmistakable data or small-talk questions, else ``None``."""
+
+    if _FASTPATH_CHATBOT.fullmatch(text):
+        return IntentType.CONVERSE_WITH_FRED_BOT
+    if _FASTPATH_SELF.search(text):
+        return None
+    if _FASTPATH_LEAD_IN.search(text) and _FASTPATH_ENTITY.search(text):
+        return IntentType.QUERY_FRED
+    return None
+
+
+async def classify_intent(ask_fn: _AskFn) -> IntentType:
     """Return the intent enum using the provided LLM callback."""
 
-    response = ask_fn(INTENT_PROMPT, True)
+    response = await ask_fn(INTENT_PROMPT, True)
     raw_text = getattr(response, "text", "")
     normalized = str(raw_text).strip().lower()
     try:
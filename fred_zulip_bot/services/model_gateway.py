@@ -0,0 +1,229 @@
+"""Gemini requests made on behalf of a chat turn: model fallback, reply cache, shared calls."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+from collections.abc import Callable, Coroutine, Iterator
+from contextvars import ContextVar
+from typing import Any, cast
+
+import orjson
+from fastapi import HTTPException
+
+from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+from fred_zulip_bot.core.models import ZulipMessage
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.response_cache import LruCache, reply_cache_key
+
+# History of the turn being processed; handlers append to it and it is saved once at the end,
+# so model calls read it here instead of going back to the repository.
+_turn_history: ContextVar[list[dict[str, Any]] | None] = ContextVar("turn_history", default=None)
+
+
+class _Flight:
+    """A shared in-flight Gemini call and the number of turns awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class ModelGateway:
+    """Ask Gemini about a Zulip message, with the conversation so far as context.
+
+    Calls on the primary model fall back to the fallback model. Identical (model, prompt,
+    message, history, config) inputs reuse the last reply, and concurrent identical requests
+    share one call.
+    """
+
+    def __init__(
+        self,
+        *,
+        gemini: GeminiClient,
+        history_repo: HistoryRepository,
+        logger: Any,
+        primary_model: str = "gemini-2.5-pro",
+        fallback_model: str = "gemini-2.5-flash",
+        model_history_turns: int = 6,
+        response_cache_size: int = 1024,
+        response_cache_ttl_seconds: float | None = 3600.0,
+    ) -> None:
+        self._gemini = gemini
+        self._history_repo = history_repo
+        self._logger = logger
+        self.primary_model = primary_model
+        self._fallback_model = fallback_model
+        self._model_history_turns = max(model_history_turns, 0)
+        self._reply_cache: LruCache[bytes, Any] = LruCache(
+            response_cache_size, ttl=response_cache_ttl_seconds
+        )
+        # Gemini calls in flight per reply-cache key.
+        self._inflight: dict[bytes, _Flight] = {}
+
+    @staticmethod
+    @contextlib.contextmanager
+    def conversation(history: list[dict[str, Any]]) -> Iterator[None]:
+        """Make ``history`` the context of every call made inside the block."""
+
+        token = _turn_history.set(history)
+        try:
+            yield
+        finally:
+            _turn_history.reset(token)
+
+    @staticmethod
+    def turn_history() -> list[dict[str, Any]] | None:
+        return _turn_history.get()
+
+    async def ask(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        use_history: bool,
+        *,
+        model_override: str | None = None,
+        allow_fallback: bool = True,
+        generation_config: dict[str, Any] | None = None,
+        bypass_cache: bool = False,
+    ) -> Any:
+        model_name = model_override or self.primary_model
+        # Only the primary model falls back; the history is loaded once for every attempt.
+        model_names = [model_name]
+        if allow_fallback and model_name == self.primary_model:
+            model_names.append(self._fallback_model)
+        history = await self.model_history(message) if use_history else None
+
+        for model_name in model_names:
+            cache_key = reply_cache_key(
+                model_name, prompt, message.content, history, generation_config
+            )
+            cached_reply = None if bypass_cache else self._reply_cache.get(cache_key)
+            if cached_reply is not None:
+                return cached_reply
+
+            try:
+                reply = await self._shared(
+                    cache_key,
+                    functools.partial(
+                        self._gemini.generate,
+                        model_name=model_name,
+                        prompt=prompt,
+                        content=message.content,
+                        history=history,
+                        generation_config=generation_config,
+                    ),
+                )
+
+                if not getattr(reply, "candidates", None):
+                    raise ValueError("no text returned")
+
+                first_candidate = reply.candidates[0]
+                if not getattr(first_candidate, "content", None) or not (
+                    first_candidate.content.parts
+                ):
+                    raise ValueError("no text returned")
+            except Exception:
+                self._logger.error("gemini model %s failed", model_name, exc_info=True)
+                continue
+
+            if not bypass_cache:
+                self._reply_cache.put(cache_key, reply)
+            return reply
+
+        raise HTTPException(status_code=500, detail="Gemini model failed")
+
+    async def ask_text(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        *,
+        use_history: bool = True,
+        model_override: str | None = None,
+        bypass_cache: bool = False,
+    ) -> str:
+        response = await self.ask(
+            message,
+            prompt,
+            use_history,
+            model_override=model_override,
+            bypass_cache=bypass_cache,
+        )
+        text = getattr(response, "text", None)
+        if isinstance(text, str):
+            return text
+        raise ValueError("no text returned")
+
+    async def ask_json(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        *,
+        schema: dict[str, Any],
+        use_history: bool = True,
+        model_override: str | None = None,
+    ) -> dict[str, Any]:
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+        }
+        response = await self.ask(
+            message,
+            prompt,
+            use_history,
+            model_override=model_override,
+            generation_config=generation_config,
+        )
+        text = getattr(response, "text", None)
+        if not isinstance(text, str):
+            raise ValueError("no json text returned")
+        try:
+            parsed = orjson.loads(text)
+        except orjson.JSONDecodeError as exc:  # pragma: no cover - defensive guard
+            raise ValueError("invalid json returned") from exc
+        if not isinstance(parsed, dict):
+            raise ValueError("invalid json returned")
+        return cast(dict[str, Any], parsed)
+
+    async def model_history(self, message: ZulipMessage) -> list[dict[str, Any]]:
+        """Return the recent turns sent to Gemini as chat context.
+
+        The stored history already ends with the current message, which is sent again as
+        the new turn, so it is dropped here instead of being billed twice.
+        """
+
+        history = _turn_history.get()
+        if history is None:
+            history = await self._history_repo.aget(message.sender_email)
+        if history and history[-1] == {"role": "user", "parts": [message.content]}:
+            history = history[:-1]
+        if not self._model_history_turns:
+            return []
+        return history[-self._model_history_turns :]
+
+    async def _shared(self, key: bytes, call: Callable[[], Coroutine[Any, Any, Any]]) -> Any:
+        """Await ``call()``, joining an identical call that is already in flight.
+
+        The call runs as its own task; it is cancelled only once every waiter has gone, so
+        a turn that gives up does not abort a reply another turn is waiting on.
+        """
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(call()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(functools.partial(self._land_flight, key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    def _land_flight(self, key: bytes, flight: _Flight, task: asyncio.Task[Any]) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
@@ -0,0 +1,266 @@
+"""Database questions: rewrite follow-ups, generate and guard SQL, run it, summarize."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from fred_zulip_bot.adapters.mysql_client import MySqlClient
+from fred_zulip_bot.core.models import ZulipMessage
+from fred_zulip_bot.services.model_gateway import ModelGateway
+from fred_zulip_bot.services.reply_writers import ReplyWriter
+from fred_zulip_bot.services.response_cache import LruCache, sql_cache_key
+from fred_zulip_bot.services.sql_service import SqlService
+from fred_zulip_bot.services.zulip_delivery import DEFAULT_FALLBACK_MESSAGE, ZulipDelivery
+
+_SQL_PREPROCESS_LOG_SNIPPET_LENGTH = 240
+
+_PROGRESS_QUERY = (
+    "Checking the database for the details you asked about. This could take some time."
+    " Thanks for your patience."
+)
+_PROGRESS_SUMMARY = "I have the data - summarizing it for you now..."
+_PROGRESS_UNSAFE = "That request looked unsafe, so I'm sending a fallback instead."
+_ANSWER_FROM_ROWS = "Answer the user's question using the SQL query result below."
+_ANSWER_FROM_MESSAGE = (
+    "A different message instead of SQL was generated. "
+    "Use the message below to answer the user's question."
+)
+
+
+class QueryService:
+    """Answer a database question from the SQL it generates and the rows that SQL returns."""
+
+    def __init__(
+        self,
+        *,
+        models: ModelGateway,
+        delivery: ZulipDelivery,
+        mysql_client: MySqlClient,
+        sql_service: SqlService,
+        answer_writer: ReplyWriter,
+        logger: Any,
+        history_max_length: int = 5,
+        sql_cache_size: int = 512,
+        sql_cache_ttl_seconds: float = 86400.0,
+        db_result_cache_size: int = 256,
+        db_result_cache_ttl_seconds: float = 60.0,
+    ) -> None:
+        self._models = models
+        self._delivery = delivery
+        self._mysql_client = mysql_client
+        self._sql_service = sql_service
+        self._answer_writer = answer_writer
+        self._logger = logger
+        self._history_limit = max(history_max_length, 0)
+        # Safe SQL per self-contained request; a hit skips the SQL generation call.
+        self._sql_cache: LruCache[bytes, str] = LruCache(
+            sql_cache_size if sql_cache_ttl_seconds > 0 else 0,
+            ttl=sql_cache_ttl_seconds,
+        )
+        # Recent results per SQL statement, for repeated questions within a short window.
+        self._db_result_cache: LruCache[str, str] = LruCache(
+            db_result_cache_size if db_result_cache_ttl_seconds > 0 else 0,
+            ttl=db_result_cache_ttl_seconds,
+        )
+
+    async def query_fred(
+        self,
+        message: ZulipMessage,
+        history: list[dict[str, Any]],
+    ) -> tuple[str, str, str]:
+        """Generate SQL, execute it, and summarize the result."""
+
+        # Progress sends never raise, so they can share the wait with the model calls.
+        _, (rewritten_message_text, sql_text) = await asyncio.gather(
+            self._delivery.progress(message, _PROGRESS_QUERY),
+            self._generate_sql(message, history),
+        )
+
+        self._logger.info("SQL generated: %s", sql_text)
+
+        is_safe_sql = self._sql_service.is_safe_sql(sql_text)
+        if not is_safe_sql:
+            self._logger.info("Unsafe SQL blocked; sending friendly fallback")
+            await self._delivery.progress(message, _PROGRESS_UNSAFE)
+            friendly_message = DEFAULT_FALLBACK_MESSAGE
+            history.append({"role": "model", "parts": [friendly_message]})
+            return friendly_message, sql_text, "salvage"
+
+        database_data = self._db_result_cache.get(sql_text)
+        if database_data is None:
+            database_data = await self._mysql_client.aselect(sql_text)
+            if database_data != "salvage":
+                self._db_result_cache.put(sql_text, database_data)
+        else:
+            self._logger.info("SQL result served from cache")
+
+        # Fixed wording first and the volatile result last, so consecutive answer calls share
+        # the longest possible prefix for Gemini's implicit prompt caching.
+        if database_data != "salvage":
+            self._logger.info("SQL result captured rows=%s", database_data[:200])
+            instruction = _ANSWER_FROM_ROWS
+            result_label = "SQL result"
+        else:
+            instruction = _ANSWER_FROM_MESSAGE
+            result_label = "Message"
+
+        # The summarizer runs without chat history, so state the question it answers.
+        answer_request = message.model_copy(
+            update={
+                "content": (
+                    f"{instruction}\nUser question: {rewritten_message_text}\n"
+                    f"{result_label}: {database_data}"
+                )
+            }
+        )
+
+        _, answer_text = await asyncio.gather(
+            self._delivery.progress(message, _PROGRESS_SUMMARY),
+            self._answer_writer.write(
+                answer_request,
+                self._sql_service.answer_prompt,
+                model_name=self._models.primary_model,
+                use_history=False,
+                # Each answer embeds its query rows, so exact repeats are rare and caching
+                # them would only evict reusable intent/SQL replies.
+                bypass_cache=True,
+            ),
+        )
+
+        history.append({"role": "model", "parts": [answer_text]})
+
+        return answer_text, sql_text, database_data
+
+    async def _generate_sql(
+        self,
+        message: ZulipMessage,
+        history: list[dict[str, Any]],
+    ) -> tuple[str, str]:
+        """Return the self-contained request and the SQL generated for it."""
+
+        rewritten_message_text = await self._preprocess_for_sql_transform(message, history)
+        cache_key = sql_cache_key(self._sql_service.sql_prompt_digest, rewritten_message_text)
+        cached_sql = self._sql_cache.get(cache_key)
+        if cached_sql is not None:
+            self._logger.info("SQL cache hit")
+            return rewritten_message_text, cached_sql
+
+        sql_request_message = message.model_copy(update={"content": rewritten_message_text})
+        sql_payload = await self._models.ask_json(
+            sql_request_message,
+            self._sql_service.sql_prompt,
+            use_history=False,
+            schema=self._sql_service.sql_generation_schema,
+        )
+
+        sql_text = str(sql_payload.get("sql", "")).strip()
+        if not sql_text:
+            raise ValueError("no sql returned")
+        if self._sql_service.is_safe_sql(sql_text):
+            self._sql_cache.put(cache_key, sql_text)
+        return rewritten_message_text, sql_text
+
+    async def _preprocess_for_sql_transform(
+        self,
+        message: ZulipMessage,
+        history: list[dict[str, Any]],
+    ) -> str:
+        relevant_history = self._extract_relevant_history_entries(history)
+        without_latest = list(relevant_history)
+        if without_latest and without_latest[-1].get("role") == "user":
+            latest_parts = without_latest[-1].get("parts", [])
+            if len(latest_parts) == 1 and latest_parts[0] == message.content:
+                without_latest = without_latest[:-1]
+
+        history_text = self._history_to_text(without_latest)
+        history_snippet = self._truncate_for_log(history_text)
+
+        self._logger.info(
+            "SQL preprocess before: history_turns=%s latest_message=%r history_snippet=%r",
+            len(without_latest),
+            self._truncate_for_log(message.content),
+            history_snippet,
+        )
+
+        if not history_text:
+            self._logger.info(
+                "SQL preprocess after: rewrite_applied=False reason=no_relevant_history",
+            )
+            return message.content
+
+        rewrite_input = (
+            "Conversation history (oldest to newest):\n"
+            f"{history_text}\n\n"
+            "Latest user message:\n"
+            f"{message.content}"
+        )
+        rewrite_message = message.model_copy(update={"content": rewrite_input})
+
+        try:
+            rewrite_payload = await self._models.ask_json(
+                rewrite_message,
+                self._sql_service.sql_rewrite_prompt,
+                use_history=False,
+                schema=self._sql_service.sql_rewrite_schema,
+            )
+        except Exception:
+            self._logger.error(
+                "SQL preprocess after: rewrite_applied=False reason=rewrite_failed",
+                exc_info=True,
+            )
+            return message.content
+
+        rewritten_request = str(rewrite_payload.get("rewritten_request", "")).strip()
+        if not rewritten_request:
+            self._logger.info(
+                "SQL preprocess after: rewrite_applied=False reason=empty_rewrite",
+            )
+            return message.content
+
+        rewritten_snippet = self._truncate_for_log(rewritten_request)
+        rewrite_applied = rewritten_request != message.content
+
+        self._logger.info(
+            "SQL preprocess after: rewrite_applied=%s rewritten_message=%r",
+            rewrite_applied,
+            rewritten_snippet,
+        )
+
+        return rewritten_request
+
+    def _extract_relevant_history_entries(
+        self,
+        history: Sequence[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        # Walk back from the newest entry and stop at the limit; entries are only read
+        # downstream, so they are returned as-is rather than copied.
+        limit = self._history_limit or len(history)
+        relevant: list[dict[str, Any]] = []
+        for entry in reversed(history):
+            if len(relevant) == limit:
+                break
+            if entry.get("role") in {"user", "model"} and entry.get("parts"):
+                relevant.append(entry)
+        relevant.reverse()
+        return relevant
+
+    @staticmethod
+    def _history_to_text(history: Iterable[dict[str, Any]]) -> str:
+        entries = (
+            (entry.get("role", "unknown"), [str(part) for part in entry.get("parts") or () if part])
+            for entry in history
+        )
+        return "\n".join(
+            f"{'assistant' if role == 'model' else role}: {' '.join(parts)}"
+            for role, parts in entries
+            if parts
+        )
+
+    @staticmethod
+    def _truncate_for_log(value: str, limit: int = _SQL_PREPROCESS_LOG_SNIPPET_LENGTH) -> str:
+        stripped = value.strip()
+        if len(stripped) <= limit:
+            return stripped
+        return f"{stripped[:limit]}…"
@@ -0,0 +1,150 @@
+"""How a generated reply reaches the user: in one piece, or streamed into Zulip as it is written.
+
+The strategy is picked per reply kind when the services are wired, so the chat flow itself
+does not branch on streaming settings.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Protocol
+
+from fred_zulip_bot.core.models import ZulipMessage
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.model_gateway import ModelGateway
+from fred_zulip_bot.services.zulip_delivery import ZulipDelivery
+
+# Streamed replies are edited in place at most this often, and only once enough new text
+# has arrived, to stay well inside Zulip's rate limits.
+_STREAM_EDIT_MIN_CHARS = 80
+_STREAM_EDIT_MIN_INTERVAL_SECONDS = 0.5
+
+
+class ReplyWriter(Protocol):
+    """Generate a text reply to ``message`` from ``prompt`` on ``model_name``."""
+
+    async def write(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        *,
+        model_name: str,
+        use_history: bool = True,
+        bypass_cache: bool = False,
+    ) -> str: ...
+
+
+class DirectReplyWriter:
+    """Generate the whole reply, leaving delivery to the end of the turn."""
+
+    def __init__(self, models: ModelGateway) -> None:
+        self._models = models
+
+    async def write(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        *,
+        model_name: str,
+        use_history: bool = True,
+        bypass_cache: bool = False,
+    ) -> str:
+        return await self._models.ask_text(
+            message,
+            prompt,
+            use_history=use_history,
+            model_override=model_name,
+            bypass_cache=bypass_cache,
+        )
+
+
+class StreamingReplyWriter:
+    """Show the reply in Zulip while it is generated, editing one message in place.
+
+    If generation fails, the regular request path (with its model fallback) produces the
+    reply instead; when part of it was already shown, the streamed message is edited to
+    that reply. The reply only counts as delivered once its final text is in Zulip;
+    otherwise the normal delivery sends it in full.
+    """
+
+    def __init__(
+        self,
+        *,
+        models: ModelGateway,
+        gemini: GeminiClient,
+        delivery: ZulipDelivery,
+        logger: Any,
+    ) -> None:
+        self._models = models
+        self._gemini = gemini
+        self._delivery = delivery
+        self._logger = logger
+        self._direct = DirectReplyWriter(models)
+
+    async def write(
+        self,
+        message: ZulipMessage,
+        prompt: str,
+        *,
+        model_name: str,
+        use_history: bool = True,
+        bypass_cache: bool = False,
+    ) -> str:
+        if not self._delivery.in_turn():
+            # Outside a turn there is no acknowledged conversation to stream into.
+            return await self._direct.write(
+                message,
+                prompt,
+                model_name=model_name,
+                use_history=use_history,
+                bypass_cache=bypass_cache,
+            )
+
+        text = ""
+        message_id: int | None = None
+        shown_chars = 0
+        last_edit = float("-inf")
+        editable = True
+        try:
+            async for piece in self._gemini.stream(
+                model_name=model_name,
+                prompt=prompt,
+                content=message.content,
+                history=await self._models.model_history(message) if use_history else None,
+            ):
+                text += piece
+                now = time.monotonic()
+                if (
+                    not editable
+                    or len(text) - shown_chars < _STREAM_EDIT_MIN_CHARS
+                    or now - last_edit < _STREAM_EDIT_MIN_INTERVAL_SECONDS
+                ):
+                    continue
+                if message_id is None:
+                    message_id = await self._delivery.show_reply(message, text)
+                    editable = message_id is not None
+                else:
+                    editable = await self._delivery.edit_reply(message_id, text)
+                shown_chars = len(text)
+                last_edit = now
+        except Exception:
+            self._logger.error("Streaming reply failed; generating it in one piece", exc_info=True)
+            text = await self._direct.write(
+                message,
+                prompt,
+                model_name=model_name,
+                use_history=use_history,
+                bypass_cache=bypass_cache,
+            )
+            if message_id is None or not editable:
+                return text
+            # Replace the partial text rather than leaving it next to a second reply.
+            shown_chars = 0
+
+        if not text:
+            raise ValueError("no text returned")
+        if message_id is not None and editable and shown_chars != len(text):
+            editable = await self._delivery.edit_reply(message_id, text)
+        if message_id is not None and editable:
+            self._delivery.mark_shown(text)
+        return text
@@ -0,0 +1,106 @@
+"""In-process caches for model responses."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Generic, TypeVar
+
+import orjson
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LruCache(Generic[K, V]):
+    """Bounded mapping that evicts the least recently used entry.
+
+    With ``ttl`` (seconds), entries also expire that long after they were stored.
+    Not thread-safe; callers use it from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, *, ttl: float | None = None) -> None:
+        self._maxsize = max(maxsize, 0)
+        self._ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if not self._maxsize:
+            return
+        expires_at = math.inf if self._ttl is None else time.monotonic() + self._ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def reply_cache_key(
+    model_name: str,
+    prompt: str,
+    content: str,
+    history: list[dict[str, Any]] | None,
+    generation_config: dict[str, Any] | None,
+) -> bytes:
+    """Digest every input that shapes a model reply into a fixed-size cache key.
+
+    Hashing keeps the key small even though system prompts embed the full schema.
+    """
+
+    hasher = hashlib.sha256()
+    for part in (model_name, prompt, content):
+        encoded = part.encode()
+        hasher.update(len(encoded).to_bytes(8, "big"))
+        hasher.update(encoded)
+    hasher.update(orjson.dumps(history or [], option=orjson.OPT_SORT_KEYS))
+    hasher.update(orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS))
+    return hasher.digest()
+
+
+def sql_cache_key(prompt_digest: str, request_text: str) -> bytes:
+    """Key generated SQL by the SQL prompt fingerprint and the self-contained request.
+
+    Including the prompt digest retires every entry once the schema or rules change.
+    """
+
+    return hashlib.blake2b(f"{prompt_digest}::{request_text}".encode(), digest_size=16).digest()
+
+
+def intent_cache_key(content: str, *, max_chars: int = 512) -> bytes:
+    """Key an intent by message text, ignoring case and runs of whitespace."""
+
+    normalized = " ".join(content.lower().split())[:max_chars]
+    return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+
+def history_tail_key(history: Sequence[dict[str, Any]] | None) -> bytes:
+    """Key the conversation state a message arrived in: the entry just before it.
+
+    The latest entry is the message itself, so the one before it is the bot's last reply
+    (or an earlier user message); a short follow-up like "yes" means something else once
+    that reply changes.
+    """
+
+    previous = history[-2] if history is not None and len(history) >= 2 else None
+    return hashlib.blake2b(
+        orjson.dumps(previous, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).digest()
@@ -0,0 +1,62 @@
+"""Embedding-similarity cache for short classification results."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import operator
+from collections import deque
+from collections.abc import Sequence
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+
+class SemanticCache(Generic[V]):
+    """Return a stored value when a new embedding is close enough to a cached one.
+
+    Vectors are L2-normalized on insert so similarity is a plain dot product. The
+    store is a linear scan over at most ``max_entries`` vectors, which stays well under
+    the cost of a model round-trip at the sizes used here, but still tens of milliseconds of
+    pure Python at full capacity, so async callers use ``alookup`` to keep the scan off the
+    event loop. Oldest entries are evicted first.
+    """
+
+    def __init__(self, *, threshold: float = 0.9, max_entries: int = 512) -> None:
+        self._threshold = threshold
+        self._entries: deque[tuple[tuple[float, ...], V]] = deque(maxlen=max(max_entries, 1))
+
+    def lookup(self, embedding: Sequence[float]) -> V | None:
+        query = _normalize(embedding)
+        if query is None:
+            return None
+
+        best_score = self._threshold
+        best_value: V | None = None
+        # Snapshot, so an ``add`` on the event loop cannot mutate the deque mid-scan.
+        for vector, value in tuple(self._entries):
+            score = sum(map(operator.mul, query, vector))
+            if score >= best_score:
+                best_score = score
+                best_value = value
+        return best_value
+
+    async def alookup(self, embedding: Sequence[float]) -> V | None:
+        """Run ``lookup`` on a worker thread."""
+
+        return await asyncio.to_thread(self.lookup, embedding)
+
+    def add(self, embedding: Sequence[float], value: V) -> None:
+        vector = _normalize(embedding)
+        if vector is not None:
+            self._entries.append((vector, value))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _normalize(embedding: Sequence[float]) -> tuple[float, ...] | None:
+    norm = math.sqrt(sum(x * x for x in embedding))
+    if not norm:
+        return None
+    return tuple(x / norm for x in embedding)
@@ -2,16 +2,62 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import re
 from pathlib import Path
 from typing import Any, Final
 
 SQL_ALLOW_PREFIX = "SELECT"
-DENY_PATTERN = re.compile(
-    r"\b(drop|alter|insert|update|delete|truncate|call|create|grant|revoke)\b",
-    re.IGNORECASE,
+# Write/DDL keywords and statement-smuggling tokens (";" also rules out multi-statements),
+# fused into one alternation so a statement is scanned once.
+UNSAFE_PATTERN = re.compile(
+    r"\b(?:drop|alter|insert|update|delete|truncate|call|create|grant|revoke)\b"
+    r"|;|--|/\*|\*/|into\s+outfile|load\s+data",
+    re.IGNORECASE | re.ASCII,
 )
-DANGEROUS_PATTERN = re.compile(r";|--|/\*|\*/|into\s+outfile|load\s+data", re.IGNORECASE)
+# Case-insensitive match avoids lower-casing the whole statement just to test its prefix.
+ALLOW_PATTERN = re.compile(rf"{SQL_ALLOW_PREFIX}\b", re.IGNORECASE)
+
+# Font/colour tables and "\*" destinations carry no text, only formatting metadata.
+_RTF_HEADER_GROUP = re.compile(r"\{\\(?:\*|fonttbl|colortbl|stylesheet|info)[^{}]*\}")
+_RTF_TOKEN = re.compile(
+    r"\\([{}\\])|\\'([0-9a-fA-F]{2})|\\(\n)|\\[a-zA-Z]+-?\d* ?|\\[^a-zA-Z]|[{}]"
+)
+
+
+def _rtf_token_text(match: re.Match[str]) -> str:
+    literal, hex_code, line_break = match.groups()
+    if literal is not None:
+        return literal
+    if hex_code is not None:
+        return bytes.fromhex(hex_code).decode("cp1252")
+    if line_break is not None:
+        return line_break
+    return ""
+
+
+def strip_rtf(text: str) -> str:
+    """Return the plain text of an RTF document; non-RTF input is returned unchanged.
+
+    The schema file is RTF, and its markup would otherwise be sent to Gemini with every SQL
+    generation request.
+    """
+
+    if not text.startswith("{\\rtf"):
+        return text
+    return _RTF_TOKEN.sub(_rtf_token_text, _RTF_HEADER_GROUP.sub("", text)).strip() + "\n"
+
+
+def _read_context(path: Path) -> str:
+    # Keyed on mtime as well, so an edited file is picked up by the next SqlService.
+    return _read_context_cached(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_context_cached(path: Path, mtime_ns: int) -> str:
+    # Decode explicitly rather than with the locale's encoding (often ASCII in containers).
+    return strip_rtf(path.read_bytes().decode("utf-8"))
 
 
 class SqlService:
@@ -22,8 +68,8 @@ class SqlService:
         ddl_path: Path = Path("context/DDLs.rtf"),
         rules_path: Path = Path("context/system_prompt_rules.txt"),
     ) -> None:
-        database_context = ddl_path.read_text()
-        system_rules = rules_path.read_text()
+        database_context = _read_context(ddl_path)
+        system_rules = _read_context(rules_path)
 
         self.sql_prompt = (
             "You are an SQL assistant.You will generate SQL queries based on the the user's request and the database information that was given to you."
@@ -34,6 +80,8 @@ class SqlService:
             f"Here is the database schema: \n{database_context}"
             f"Here are rules you must adhere to when creating sql queries: \n{system_rules}"
         )
+        # Short, stable fingerprint of the SQL prompt for cache keys.
+        self.sql_prompt_digest = hashlib.sha256(self.sql_prompt.encode()).hexdigest()[:16]
 
         self.sql_rewrite_prompt = (
             "You rewrite follow-up database questions into a single, self-contained request for SQL generation."
@@ -62,15 +110,9 @@ class SqlService:
         )
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def is_safe_sql(sql: str) -> bool:
         stripped = sql.strip()
-        if not stripped.lower().startswith(SQL_ALLOW_PREFIX.lower()):
-            return False
-
-        if DENY_PATTERN.search(stripped):
-            return False
-
-        if DANGEROUS_PATTERN.search(stripped):
+        if not ALLOW_PATTERN.match(stripped):
             return False
-
-        return stripped.count(";") == 0
+        return UNSAFE_PATTERN.search(stripped) is None
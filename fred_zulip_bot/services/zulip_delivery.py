@@ -0,0 +1,141 @@
+"""Zulip messages sent during a chat turn: acknowledgement, progress updates and the reply."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from fred_zulip_bot.adapters.zulip_client import ZulipClient
+from fred_zulip_bot.core.models import ZulipMessage
+
+DEFAULT_FALLBACK_MESSAGE = (
+    "I'm having trouble responding right now. Please report this to my creators."
+)
+
+_ACK_MESSAGE = "thinking..."
+
+# Acknowledgement and progress sends queued for the message being processed, oldest first.
+# Each waits for the one before it and the final reply waits for the last, so the user sees
+# "thinking...", then progress, then the answer, without the turn blocking on Zulip.
+_outbox: ContextVar[list[asyncio.Task[None]] | None] = ContextVar("outbox", default=None)
+# Replies already shown in Zulip by streaming edits during this turn; delivery skips them.
+_streamed_replies: ContextVar[list[str] | None] = ContextVar("streamed_replies", default=None)
+
+
+class ZulipDelivery:
+    """Send a turn's messages to the sender in order, without making the turn wait on Zulip."""
+
+    def __init__(self, *, zulip_client: ZulipClient, logger: Any, max_attempts: int = 2) -> None:
+        self._zulip_client = zulip_client
+        self._logger = logger
+        self._max_attempts = max_attempts
+
+    @contextlib.contextmanager
+    def turn(self, message: ZulipMessage) -> Iterator[None]:
+        """Acknowledge ``message`` and queue the turn's progress updates behind it."""
+
+        outbox_token = _outbox.set([asyncio.create_task(self._send_ack(message))])
+        streamed_token = _streamed_replies.set([])
+        try:
+            yield
+        finally:
+            _outbox.reset(outbox_token)
+            _streamed_replies.reset(streamed_token)
+
+    @staticmethod
+    def in_turn() -> bool:
+        return _streamed_replies.get() is not None
+
+    async def progress(self, message: ZulipMessage, content: str) -> None:
+        """Queue a progress update; never raises."""
+
+        outbox = _outbox.get()
+        if outbox is None:
+            await self._post_progress_update(message, content)
+            return
+        outbox.append(
+            asyncio.create_task(self._post_progress_update(message, content, after=outbox[-1]))
+        )
+
+    @staticmethod
+    async def drain() -> None:
+        outbox = _outbox.get()
+        if outbox:
+            # Sends never raise; wait() also tolerates a cancelled one.
+            await asyncio.wait([outbox[-1]])
+
+    async def deliver(self, message: ZulipMessage, content: str) -> None:
+        """Send the final reply after the queued updates, unless streaming already showed it."""
+
+        await self.drain()
+        streamed = _streamed_replies.get()
+        if streamed and content in streamed:
+            return
+
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await self._send(message, content)
+                return
+            except Exception:
+                self._logger.error(
+                    "Send Zulip Message Failed (attempt %s/%s)",
+                    attempt,
+                    self._max_attempts,
+                    exc_info=True,
+                )
+        # If all attempts fail we have nothing left to try; log once more for visibility.
+        self._logger.error("Exhausted attempts to deliver message to %s", message.sender_email)
+
+    async def show_reply(self, message: ZulipMessage, content: str) -> int | None:
+        """Post the start of a reply that will be edited in place; returns its message id."""
+
+        await self.drain()
+        return await self._send(message, content)
+
+    async def edit_reply(self, message_id: int, content: str) -> bool:
+        try:
+            await self._zulip_client.update(message_id, content)
+        except Exception:
+            self._logger.error("Editing streamed reply failed", exc_info=True)
+            return False
+        return True
+
+    @staticmethod
+    def mark_shown(content: str) -> None:
+        """Record that ``content`` is already in Zulip, so ``deliver`` does not repeat it."""
+
+        streamed = _streamed_replies.get()
+        if streamed is not None:
+            streamed.append(content)
+
+    async def _send_ack(self, message: ZulipMessage) -> None:
+        try:
+            await self._send(message, _ACK_MESSAGE)
+        except Exception:
+            self._logger.error("Send Zulip Message Failed", exc_info=True)
+
+    async def _post_progress_update(
+        self,
+        message: ZulipMessage,
+        content: str,
+        *,
+        after: asyncio.Task[None] | None = None,
+    ) -> None:
+        if after is not None:
+            await asyncio.wait([after])
+        try:
+            await self._send(message, content)
+        except Exception:
+            self._logger.error("Progress update failed", exc_info=True)
+
+    async def _send(self, message: ZulipMessage, content: str) -> int | None:
+        return await self._zulip_client.send(
+            to=[message.sender_email],
+            msg_type=message.type,
+            subject=message.subject,
+            content=content,
+            channel_name=message.display_recipient,
+        )
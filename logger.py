@@ -1,8 +1,14 @@
 # logger.py
+import atexit
+import copy
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import cast
+
+import orjson
 
 # Create logs directory if it doesn't exist
 LOG_DIR = "logs"
@@ -12,20 +18,97 @@ if not os.path.exists(LOG_DIR):
 # Path to log file
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 
+# Bound on records waiting for the listener thread; past it, new records are dropped.
+LOG_QUEUE_SIZE = 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """Render each record as one JSON object per line, so the file can be batch-processed
+    without regex parsing."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return orjson.dumps(payload).decode()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hand records to the listener without ever waiting on it.
+
+    Logging happens on the event loop, so a full queue (a wedged disk or stdout pipe) must
+    not block the caller: records that do not fit are counted and dropped, and the count is
+    logged as a warning once the queue has room again.
+
+    The stock ``prepare`` folds the traceback into the message; this one renders it into
+    ``exc_text`` instead, so formatters on the listener side can keep it as its own field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # Tracebacks hold frames alive; only the rendered text crosses the queue.
+            record.exc_info = None
+        return record
+
+    def __init__(self, queue_: queue.Queue[logging.LogRecord]) -> None:
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Handler.handle holds the handler lock here, so the counter needs no lock of its own.
+        log_queue = cast("queue.Queue[logging.LogRecord]", self.queue)
+        try:
+            if self.dropped:
+                log_queue.put_nowait(self._drop_notice(record.name))
+                self.dropped = 0
+            log_queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drop_notice(self, name: str) -> logging.LogRecord:
+        return logging.LogRecord(
+            name,
+            logging.WARNING,
+            __file__,
+            0,
+            f"dropped={self.dropped} log records while the log queue was full",
+            None,
+            None,
+        )
+
+
 # Set up rotating log handler (e.g., 1MB per file, up to 5 backups)
 handler = RotatingFileHandler(LOG_FILE, maxBytes=1_000_000, backupCount=5)
+handler.setFormatter(JsonFormatter())
 formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
-handler.setFormatter(formatter)
 
 # Create logger instance
 logger = logging.getLogger("AppLogger")
 logger.setLevel(logging.INFO)
-logger.addHandler(handler)
 
 # Add stream handler to print logs to console
 stream_handler = logging.StreamHandler(sys.stdout)
 stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
+
+# File and console writes (and log rotation) run on a listener thread, so a slow disk or
+# stdout pipe never stalls the event loop; the queue is drained on interpreter exit. The
+# queue is bounded so a wedged disk costs dropped records rather than unbounded memory.
+log_queue: queue.Queue[logging.LogRecord] = queue.Queue(LOG_QUEUE_SIZE)
+listener = QueueListener(log_queue, handler, stream_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+logger.addHandler(BoundedQueueHandler(log_queue))
 
 # Avoid duplicate logs if imported multiple times
 logger.propagate = False
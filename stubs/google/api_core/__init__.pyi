@@ -0,0 +1,3 @@
+"""Stub package marker for google.api_core."""
+
+__all__: list[str] = []
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., Awaitable[Any]])
+
+def if_transient_error(exception: BaseException) -> bool: ...
+
+class AsyncRetry:
+    def __init__(
+        self,
+        predicate: Callable[[BaseException], bool] = ...,
+        initial: float = ...,
+        maximum: float = ...,
+        multiplier: float = ...,
+        timeout: float | None = ...,
+    ) -> None: ...
+    def __call__(self, func: _F) -> _F: ...
@@ -3,12 +3,27 @@ from __future__ import annotations
 from collections.abc import Iterable
 from typing import Any, Protocol
 
+from . import caching as caching
+
 class ChatSession(Protocol):
     def send_message(self, content: str) -> Any: ...
+    async def send_message_async(
+        self, content: str, *, stream: bool = ..., request_options: dict[str, Any] | None = ...
+    ) -> Any: ...
 
 class GenerativeModel:
     def __init__(self, *, model_name: str, system_instruction: str) -> None: ...
     def start_chat(self, history: Iterable[Any] | None = ...) -> ChatSession: ...
     def generate_content(self, content: str) -> Any: ...
+    async def generate_content_async(
+        self, content: str, *, stream: bool = ..., request_options: dict[str, Any] | None = ...
+    ) -> Any: ...
+    @classmethod
+    def from_cached_content(
+        cls,
+        cached_content: str | caching.CachedContent,
+        *,
+        generation_config: Any | None = ...,
+    ) -> GenerativeModel: ...
 
 def configure(*, api_key: str) -> None: ...
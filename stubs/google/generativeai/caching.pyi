@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+class CachedContent:
+    name: str
+    @classmethod
+    def create(
+        cls,
+        model: str,
+        *,
+        system_instruction: str | None = ...,
+        ttl: timedelta | None = ...,
+    ) -> CachedContent: ...
+    def delete(self) -> None: ...
+    def update(self, *, ttl: timedelta | None = ...) -> None: ...
@@ -4,28 +4,53 @@ import importlib
 from typing import Any
 
 import pytest
+from fastapi.testclient import TestClient
+
+from config import Config, get_settings
 
 
 class DummyHistoryRepo:
-    def __init__(self, path, *, max_length, logger):  # type: ignore[override]
+    def __init__(self, path, *, max_length, logger, flush_interval=None):  # type: ignore[override]
         self.path = path
         self.max_length = max_length
+        self.flush_interval = flush_interval
         self.logger = logger
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
 
 
 class DummyZulipClient:
     def __init__(self, **_: Any) -> None:
-        pass
+        self.closed = False
+
+    async def aclose(self) -> None:
+        self.closed = True
 
 
 class DummyMySqlClient:
-    def __init__(self, **_: Any) -> None:
-        pass
+    def __init__(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
+        self.closed = False
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class DummyGeminiClient:
+    def __init__(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
+        self.embedded: list[str] = []
+
+    def embed(self, text: str) -> list[float]:
+        self.embedded.append(text)
+        return [1.0, 0.0]
 
 
 class DummyChatService:
-    def __init__(self, **_: Any) -> None:
-        pass
+    def __init__(self, **kwargs: Any) -> None:
+        self.kwargs = kwargs
 
     def handle_chat_request(self, request, background_tasks):  # pragma: no cover
         raise NotImplementedError
@@ -41,10 +66,41 @@ class DummyConfig:
     DB_NAME = "db"
     DB_USER = "user"
     DB_PASSWORD = "pw"  # noqa: S105
+    DB_POOL_SIZE = 3
+    DB_MAX_ROWS = 200
+    DB_MAX_RESULT_CHARS = 20_000
     GENAI_API_KEY = "key"
+    HISTORY_BACKEND = "tinydb"
     HISTORY_DB_PATH = "history.json"
+    HISTORY_SQLITE_PATH = "history.sqlite3"
+    HISTORY_FLUSH_INTERVAL_SECONDS = 1.0
+    HISTORY_WRITE_BEHIND = False
+    HISTORY_WRITE_DELAY_SECONDS = 0.2
     HISTORY_MAX_LENGTH = 5
+    GEMINI_HISTORY_TURNS = 6
+    GEMINI_INTENT_MODEL = "gemini-2.5-flash"
+    GEMINI_CHAT_MODEL = "gemini-2.5-flash"
+    STREAM_SMALL_TALK = False
+    STREAM_ANSWERS = False
+    SQL_CACHE_SIZE = 512
+    SQL_CACHE_TTL_SECONDS = 86400
+    DB_RESULT_CACHE_SIZE = 256
+    DB_RESULT_CACHE_TTL_SECONDS = 60
+    INTENT_RETRY_WINDOW_SECONDS = 30
     ENABLE_LANGGRAPH = False
+    GEMINI_RESPONSE_CACHE_SIZE = 0
+    GEMINI_RESPONSE_CACHE_TTL_SECONDS = 3600
+    INTENT_SEMANTIC_CACHE = False
+    INTENT_SEMANTIC_THRESHOLD = 0.92
+    CHATBOT_SEMANTIC_CACHE = False
+    CHATBOT_SEMANTIC_THRESHOLD = 0.96
+    FAQ_PATH = ""
+    FAQ_THRESHOLD = 0.9
+    GEMINI_CONTEXT_CACHE = False
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS = 3600
+    effective_zulip_email = ZULIP_BOT_EMAIL_TEST
+    effective_zulip_token = ZULIP_BOT_TOKEN_TEST
+    effective_auth_token = ZULIP_AUTH_TOKEN_TEST
 
 
 @pytest.fixture
@@ -61,17 +117,130 @@ def app_module(monkeypatch: pytest.MonkeyPatch):
 
     module = importlib.import_module("fred_zulip_bot.apps.api.app")
     module = importlib.reload(module)
-    return module
+    yield module
+    get_settings.cache_clear()
 
 
 def test_create_app_sets_up_services(monkeypatch: pytest.MonkeyPatch, app_module) -> None:
     monkeypatch.setattr(app_module, "TinyDbHistoryRepo", DummyHistoryRepo)
     monkeypatch.setattr(app_module, "ZulipClient", DummyZulipClient)
     monkeypatch.setattr(app_module, "MySqlClient", DummyMySqlClient)
+    monkeypatch.setattr(app_module, "GeminiClient", DummyGeminiClient)
     monkeypatch.setattr(app_module, "ChatService", DummyChatService)
-    monkeypatch.setattr(app_module, "config", DummyConfig)
+    monkeypatch.setattr(app_module, "get_settings", lambda: DummyConfig)
 
     app = app_module.create_app()
 
     assert "chat_service" in app.state.services  # noqa: S101
     assert app.state.services["history_repo"].max_length == DummyConfig.HISTORY_MAX_LENGTH  # noqa: S101
+    assert app.state.services["mysql_client"].kwargs["pool_size"] == DummyConfig.DB_POOL_SIZE  # noqa: S101
+
+
+def test_app_shutdown_closes_services(monkeypatch: pytest.MonkeyPatch, app_module) -> None:
+    monkeypatch.setattr(app_module, "TinyDbHistoryRepo", DummyHistoryRepo)
+    monkeypatch.setattr(app_module, "ZulipClient", DummyZulipClient)
+    monkeypatch.setattr(app_module, "MySqlClient", DummyMySqlClient)
+    monkeypatch.setattr(app_module, "GeminiClient", DummyGeminiClient)
+    monkeypatch.setattr(app_module, "ChatService", DummyChatService)
+    monkeypatch.setattr(app_module, "get_settings", lambda: DummyConfig)
+
+    app = app_module.create_app()
+    with TestClient(app):
+        assert app.state.services["history_repo"].closed is False  # noqa: S101
+        assert app.state.services["zulip_client"].closed is False  # noqa: S101
+        assert app.state.services["mysql_client"].closed is False  # noqa: S101
+
+    assert app.state.services["history_repo"].closed is True  # noqa: S101
+    assert app.state.services["zulip_client"].closed is True  # noqa: S101
+    assert app.state.services["mysql_client"].closed is True  # noqa: S101
+
+
+def test_app_startup_builds_faq_index(
+    monkeypatch: pytest.MonkeyPatch, app_module, tmp_path
+) -> None:
+    faq_path = tmp_path / "faq.json"
+    faq_path.write_text('[{"question": "Who are you?", "answer": "Fred."}]')
+
+    class FaqConfig(DummyConfig):
+        FAQ_PATH = str(faq_path)
+
+    monkeypatch.setattr(app_module, "TinyDbHistoryRepo", DummyHistoryRepo)
+    monkeypatch.setattr(app_module, "ZulipClient", DummyZulipClient)
+    monkeypatch.setattr(app_module, "MySqlClient", DummyMySqlClient)
+    monkeypatch.setattr(app_module, "GeminiClient", DummyGeminiClient)
+    monkeypatch.setattr(app_module, "ChatService", DummyChatService)
+    monkeypatch.setattr(app_module, "get_settings", lambda: FaqConfig)
+
+    app = app_module.create_app()
+    assert app.state.services.get_if_built("faq_index") is None  # noqa: S101
+    with TestClient(app):
+        assert app.state.services["faq_index"].built is True  # noqa: S101
+        assert app.state.services["gemini_client"].embedded == ["Who are you?"]  # noqa: S101
+
+
+def test_reply_streaming_is_chosen_when_wiring(monkeypatch: pytest.MonkeyPatch, app_module) -> None:
+    class StreamingConfig(DummyConfig):
+        STREAM_SMALL_TALK = True
+
+    monkeypatch.setattr(app_module, "TinyDbHistoryRepo", DummyHistoryRepo)
+    monkeypatch.setattr(app_module, "ZulipClient", DummyZulipClient)
+    monkeypatch.setattr(app_module, "MySqlClient", DummyMySqlClient)
+    monkeypatch.setattr(app_module, "GeminiClient", DummyGeminiClient)
+    monkeypatch.setattr(app_module, "ChatService", DummyChatService)
+    monkeypatch.setattr(app_module, "get_settings", lambda: StreamingConfig)
+
+    services = app_module.create_app().state.services
+    chat_kwargs = services["chat_service"].kwargs
+
+    assert isinstance(chat_kwargs["reply_writer"], app_module.StreamingReplyWriter)  # noqa: S101
+    assert chat_kwargs["queries"] is services["query_service"]  # noqa: S101
+    assert chat_kwargs["delivery"] is services["zulip_delivery"]  # noqa: S101
+    assert chat_kwargs["embed"] == services["gemini_client"].embed  # noqa: S101
+    assert isinstance(  # noqa: S101
+        services["query_service"]._answer_writer, app_module.DirectReplyWriter
+    )
+
+
+def test_services_are_built_lazily(monkeypatch: pytest.MonkeyPatch, app_module) -> None:
+    built: list[str] = []
+
+    class RecordingHistoryRepo(DummyHistoryRepo):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            built.append("history_repo")
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "TinyDbHistoryRepo", RecordingHistoryRepo)
+    monkeypatch.setattr(app_module, "ZulipClient", DummyZulipClient)
+    monkeypatch.setattr(app_module, "MySqlClient", DummyMySqlClient)
+    monkeypatch.setattr(app_module, "GeminiClient", DummyGeminiClient)
+    monkeypatch.setattr(app_module, "ChatService", DummyChatService)
+    monkeypatch.setattr(app_module, "get_settings", lambda: DummyConfig)
+
+    app = app_module.create_app()
+    with TestClient(app) as client:
+        assert client.get("/healthz").status_code == 200  # noqa: S101
+        assert built == []  # noqa: S101
+
+        services = app.state.services
+        assert services["chat_service"] is services["chat_service"]  # noqa: S101
+        assert built == ["history_repo"]  # noqa: S101
+        assert services.get_if_built("mysql_client") is not None  # noqa: S101
+
+    with pytest.raises(KeyError):
+        app.state.services["unknown"]
+
+
+def test_get_settings_is_memoized(app_module) -> None:
+    get_settings.cache_clear()
+
+    assert get_settings() is get_settings()  # noqa: S101
+
+
+def test_config_effective_credentials_follow_test_mode(app_module) -> None:
+    live = Config(ZULIP_BOT_EMAIL_TEST="test-bot@example.com")
+    assert live.effective_zulip_email == "bot@example.com"  # noqa: S101
+
+    test = Config(TEST_MODE=True, ZULIP_BOT_EMAIL_TEST="test-bot@example.com")
+    assert test.effective_zulip_email == "test-bot@example.com"  # noqa: S101
+    assert test.effective_zulip_token == "token"  # noqa: S101, S105
+    assert test.effective_auth_token == "auth"  # noqa: S101, S105
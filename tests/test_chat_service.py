@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import sys
 from dataclasses import dataclass, field
 from typing import Any
@@ -7,14 +8,27 @@ from typing import Any
 import pytest
 from fastapi import BackgroundTasks, HTTPException
 
+from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
 from fred_zulip_bot.core.models import ChatRequest, ZulipMessage
-from fred_zulip_bot.services import intent_service
+from fred_zulip_bot.services import intent_service, model_gateway
 from fred_zulip_bot.services.chat_service import DEFAULT_FALLBACK_MESSAGE, ChatService
+from fred_zulip_bot.services.faq_index import FaqIndex
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.intent_service import IntentType
+from fred_zulip_bot.services.model_gateway import ModelGateway
+from fred_zulip_bot.services.query_service import QueryService
+from fred_zulip_bot.services.reply_writers import (
+    DirectReplyWriter,
+    ReplyWriter,
+    StreamingReplyWriter,
+)
+from fred_zulip_bot.services.semantic_cache import SemanticCache
 from fred_zulip_bot.services.sql_service import SqlService
+from fred_zulip_bot.services.zulip_delivery import ZulipDelivery
 
 
 @dataclass
-class FakeHistoryRepo:
+class FakeHistoryRepo(HistoryRepository):
     store: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
 
     def get(self, email: str) -> list[dict[str, Any]]:
@@ -27,9 +41,14 @@ class FakeHistoryRepo:
 @dataclass
 class FakeZulipClient:
     sent: list[dict[str, Any]] = field(default_factory=list)
+    updates: list[tuple[int, str]] = field(default_factory=list)
 
-    def send(self, **kwargs: Any) -> None:
+    async def send(self, **kwargs: Any) -> int:
         self.sent.append(kwargs)
+        return len(self.sent)
+
+    async def update(self, message_id: int, content: str) -> None:
+        self.updates.append((message_id, content))
 
 
 @dataclass
@@ -39,7 +58,7 @@ class FakeMySqlClient:
     def __init__(self, result: str) -> None:
         self.result = result
 
-    def select(self, sql: str) -> str:
+    async def aselect(self, sql: str) -> str:
         self.last_query = sql
         return self.result
 
@@ -82,8 +101,10 @@ def build_service(
     db_result: str = "rows",
     summary_text: str | None = None,
     use_langgraph: bool = False,
+    stream_small_talk: bool = False,
+    stream_answers: bool = False,
 ) -> tuple[ChatService, FakeZulipClient, FakeHistoryRepo, FakeMySqlClient, DummyLogger]:
-    monkeypatch.setattr(ChatService, "_configure_genai", lambda self, api_key: None)
+    monkeypatch.setattr(GeminiClient, "_configure_genai", lambda self, api_key: None)
 
     mapping: dict[str, str] = {intent_service.INTENT_PROMPT: intent_label}
 
@@ -100,7 +121,7 @@ def build_service(
 
     call_log: list[dict[str, Any]] = []
 
-    def fake_ask_model(
+    async def fake_ask(
         self,
         message,
         prompt,
@@ -109,6 +130,7 @@ def build_service(
         model_override=None,
         allow_fallback=True,
         generation_config=None,
+        bypass_cache=False,
     ):  # type: ignore[override]
         try:
             text = mapping[prompt]
@@ -119,28 +141,48 @@ def build_service(
                 "prompt": prompt,
                 "content": message.content,
                 "use_history": use_history,
+                "model_override": model_override,
                 "generation_config": dict(generation_config) if generation_config else None,
+                "bypass_cache": bypass_cache,
             }
         )
         return DummyReply(text)
 
-    monkeypatch.setattr(ChatService, "_ask_model", fake_ask_model)
+    monkeypatch.setattr(ModelGateway, "ask", fake_ask)
 
     fake_history = FakeHistoryRepo()
     fake_zulip = FakeZulipClient()
     fake_mysql = FakeMySqlClient(db_result)
     logger = DummyLogger()
 
+    gemini = GeminiClient(api_key="api-key")
+    models = ModelGateway(gemini=gemini, history_repo=fake_history, logger=logger)
+    delivery = ZulipDelivery(zulip_client=fake_zulip, logger=logger)  # type: ignore[arg-type]
+
+    def writer(stream: bool) -> ReplyWriter:
+        if not stream:
+            return DirectReplyWriter(models)
+        return StreamingReplyWriter(models=models, gemini=gemini, delivery=delivery, logger=logger)
+
+    queries = QueryService(
+        models=models,
+        delivery=delivery,
+        mysql_client=fake_mysql,  # type: ignore[arg-type]
+        sql_service=sql_service,
+        answer_writer=writer(stream_answers),
+        logger=logger,
+        history_max_length=5,
+    )
     service = ChatService(
-        zulip_client=fake_zulip,
         history_repo=fake_history,
-        mysql_client=fake_mysql,
-        sql_service=sql_service,
+        delivery=delivery,
+        models=models,
+        queries=queries,
+        reply_writer=writer(stream_small_talk),
+        embed=gemini.embed,
         auth_token="secret",  # noqa: S106
         logger=logger,
-        api_key="api-key",
         enable_langgraph=use_langgraph,
-        history_max_length=5,
     )
 
     service._test_ask_calls = call_log  # type: ignore[attr-defined]
@@ -167,16 +209,19 @@ def test_process_user_message_chatbot(monkeypatch, sql_service):
         chatbot_reply="Hello there",
     )
 
-    service.process_user_message(make_request("hi"))
+    asyncio.run(service.process_user_message(make_request("hi")))
 
     contents = [entry["content"] for entry in zulip.sent]
     assert contents == [  # noqa: S101
+        "thinking...",
         "Figuring out the best way to help.",
         "Drafting a reply about how I work.",
         "Hello there",
     ]
     saved = history.get("user@example.com")
     assert saved[-1]["parts"] == ["Hello there"]  # noqa: S101
+    models = [call["model_override"] for call in service._test_ask_calls]
+    assert models == ["gemini-2.5-flash", "gemini-2.5-flash"]  # noqa: S101
 
 
 def test_process_user_message_database_flow(monkeypatch, sql_service):
@@ -189,10 +234,11 @@ def test_process_user_message_database_flow(monkeypatch, sql_service):
         summary_text="There is one result.",
     )
 
-    service.process_user_message(make_request("how many?"))
+    asyncio.run(service.process_user_message(make_request("how many?")))
 
     contents = [entry["content"] for entry in zulip.sent]
     assert contents == [  # noqa: S101
+        "thinking...",
         "Figuring out the best way to help.",
         "Checking the database for the details you asked about. This could take some time. Thanks for your patience.",
         "I have the data - summarizing it for you now...",
@@ -232,7 +278,7 @@ def test_query_fred_preprocesses_follow_up(monkeypatch, sql_service):
         type="stream",
     )
 
-    response_text, sql_text, db_data = service.query_fred(message, history_entries)
+    response_text, sql_text, db_data = asyncio.run(service.query_fred(message, history_entries))
 
     expected_sql = "SELECT * FROM projects WHERE state = 'Maryland'"
     assert mysql.last_query == expected_sql  # noqa: S101
@@ -264,6 +310,16 @@ def test_query_fred_preprocesses_follow_up(monkeypatch, sql_service):
 
     assert ask_calls[2]["prompt"] == sql_service.answer_prompt  # noqa: S101
     assert ask_calls[2]["generation_config"] is None  # noqa: S101
+    assert ask_calls[2]["use_history"] is False  # noqa: S101
+    # SQL work stays on the primary model, which is the one allowed to fall back.
+    assert [call["model_override"] for call in ask_calls[:2]] == [None, None]  # noqa: S101
+    assert ask_calls[2]["model_override"] == "gemini-2.5-pro"  # noqa: S101
+    expected_answer_request = (
+        "Answer the user's question using the SQL query result below.\n"
+        "User question: List the translation projects in Maryland.\n"
+        "SQL result: rows"
+    )
+    assert ask_calls[2]["content"] == expected_answer_request  # noqa: S101
 
 
 def test_process_user_message_other(monkeypatch, sql_service):
@@ -274,10 +330,11 @@ def test_process_user_message_other(monkeypatch, sql_service):
         other_reply="Cannot help",
     )
 
-    service.process_user_message(make_request("other question"))
+    asyncio.run(service.process_user_message(make_request("other question")))
 
     contents = [entry["content"] for entry in zulip.sent]
     assert contents == [  # noqa: S101
+        "thinking...",
         "Figuring out the best way to help.",
         "Working on a helpful explanation since I can't do that directly.",
         "Cannot help",
@@ -298,12 +355,12 @@ def test_handle_chat_request_rejects_invalid_token(monkeypatch, sql_service):
     request.token = "bad"  # noqa: S105
 
     with pytest.raises(HTTPException) as exc:
-        service.handle_chat_request(request, BackgroundTasks())
+        asyncio.run(service.handle_chat_request(request, BackgroundTasks()))
 
     assert exc.value.status_code == 401  # noqa: S101
 
 
-def test_handle_chat_request_sends_ack(monkeypatch, sql_service):
+def test_handle_chat_request_defers_ack_to_background(monkeypatch, sql_service):
     service, zulip, _, _, _ = build_service(
         monkeypatch,
         sql_service,
@@ -312,10 +369,34 @@ def test_handle_chat_request_sends_ack(monkeypatch, sql_service):
     )
 
     request = make_request("hi")
+    background_tasks = BackgroundTasks()
+
+    asyncio.run(service.handle_chat_request(request, background_tasks))
+
+    assert zulip.sent == []  # noqa: S101
+    assert len(background_tasks.tasks) == 1  # noqa: S101
+
+
+def test_process_user_message_ack_failure_still_replies(monkeypatch, sql_service):
+    service, zulip, _, _, logger = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        chatbot_reply="Hello",
+    )
+    original_send = zulip.send
 
-    service.handle_chat_request(request, BackgroundTasks())
+    async def failing_ack(**kwargs: Any) -> None:
+        if kwargs["content"] == "thinking...":
+            raise RuntimeError("zulip down")
+        await original_send(**kwargs)
 
-    assert zulip.sent[0]["content"] == "thinking..."  # noqa: S101
+    monkeypatch.setattr(zulip, "send", failing_ack)
+
+    asyncio.run(service.process_user_message(make_request("hi")))
+
+    assert [entry["content"] for entry in zulip.sent][-1] == "Hello"  # noqa: S101
+    assert any("Send Zulip Message Failed" in entry[0] for entry in logger.errors)  # noqa: S101
 
 
 def test_process_user_message_database_salvage(monkeypatch, sql_service):
@@ -328,11 +409,12 @@ def test_process_user_message_database_salvage(monkeypatch, sql_service):
         summary_text="Use fallback",
     )
 
-    service.process_user_message(make_request("fallback?"))
+    asyncio.run(service.process_user_message(make_request("fallback?")))
 
     assert mysql.last_query == "SELECT name"  # noqa: S101
     contents = [entry["content"] for entry in zulip.sent]
     assert contents == [  # noqa: S101
+        "thinking...",
         "Figuring out the best way to help.",
         "Checking the database for the details you asked about. This could take some time. Thanks for your patience.",
         "I have the data - summarizing it for you now...",
@@ -353,13 +435,14 @@ def test_process_user_message_unsafe_sql(monkeypatch, sql_service):
         summary_text="unused",
     )
 
-    monkeypatch.setattr(service._sql_service, "is_safe_sql", lambda _: False)
+    monkeypatch.setattr(sql_service, "is_safe_sql", lambda _: False)
 
-    service.process_user_message(make_request("unsafe"))
+    asyncio.run(service.process_user_message(make_request("unsafe")))
 
     friendly = DEFAULT_FALLBACK_MESSAGE
     contents = [entry["content"] for entry in zulip.sent]
     assert contents == [  # noqa: S101
+        "thinking...",
         "Figuring out the best way to help.",
         "Checking the database for the details you asked about. This could take some time. Thanks for your patience.",
         "That request looked unsafe, so I'm sending a fallback instead.",
@@ -378,15 +461,15 @@ def test_process_user_message_failure_sends_fallback(monkeypatch, sql_service):
         chatbot_reply="unused",
     )
 
-    def explode(*args: Any, **kwargs: Any) -> str:
+    async def explode(*args: Any, **kwargs: Any) -> str:
         raise RuntimeError("boom")
 
     monkeypatch.setattr(service, "_run_legacy_flow", explode)
 
-    service.process_user_message(make_request("hi"))
+    asyncio.run(service.process_user_message(make_request("hi")))
 
     contents = [entry["content"] for entry in zulip.sent]
-    assert contents == [DEFAULT_FALLBACK_MESSAGE]  # noqa: S101
+    assert contents == ["thinking...", DEFAULT_FALLBACK_MESSAGE]  # noqa: S101
     saved = history.get("user@example.com")
     assert saved[-1]["parts"] == [DEFAULT_FALLBACK_MESSAGE]  # noqa: S101
     assert any("Processing user message failed" in entry[0] for entry in logger.errors)  # noqa: S101
@@ -403,15 +486,15 @@ def test_process_user_message_retries_on_send_failure(monkeypatch, sql_service):
     attempts: list[dict[str, Any]] = []
     failed_final = {"value": False}
 
-    def flaky_send(**kwargs: Any) -> None:
+    async def flaky_send(**kwargs: Any) -> None:
         if kwargs.get("content") == "Hello" and not failed_final["value"]:
             failed_final["value"] = True
             raise RuntimeError("network glitch")
         attempts.append(kwargs)
 
-    monkeypatch.setattr(service._zulip_client, "send", flaky_send)
+    monkeypatch.setattr(service._delivery._zulip_client, "send", flaky_send)
 
-    service.process_user_message(make_request("hi"))
+    asyncio.run(service.process_user_message(make_request("hi")))
 
     contents = [entry["content"] for entry in attempts]
     assert contents[-1] == "Hello"  # noqa: S101
@@ -429,13 +512,485 @@ def test_process_user_message_with_langgraph(monkeypatch, sql_service):
         chatbot_reply="LangGraph reply",
         use_langgraph=True,
     )
+    runner = service._graph_runner
+    assert runner is not None  # noqa: S101
 
-    service.process_user_message(make_request("hi"))
+    asyncio.run(service.process_user_message(make_request("hi")))
+    asyncio.run(service.process_user_message(make_request("hi")))
+
+    assert service._graph_runner is runner  # noqa: S101
 
     contents = [entry["content"] for entry in zulip.sent]
-    assert contents == [  # noqa: S101
+    expected_turn = [
+        "thinking...",
         "Figuring out the best way to help.",
         "Drafting a reply about how I work.",
         "LangGraph reply",
     ]
+    assert contents == expected_turn * 2  # noqa: S101
     assert history.get("user@example.com")[-1]["parts"] == ["LangGraph reply"]  # noqa: S101
+
+
+def test_classify_intent_uses_semantic_cache(monkeypatch, sql_service):
+    service, _, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+    )
+    service._intent_cache = SemanticCache(threshold=0.9)
+    embeddings = {"projects in Kenya?": [1.0, 0.0], "projects in Kenya??": [0.99, 0.05]}
+    monkeypatch.setattr(service, "_embed", lambda text: embeddings[text])
+
+    async def classify_both() -> tuple[IntentType, IntentType]:
+        first = await service.classify_intent(make_request("projects in Kenya?").message)
+        second = await service.classify_intent(make_request("projects in Kenya??").message)
+        return first, second
+
+    assert asyncio.run(classify_both()) == (IntentType.QUERY_FRED, IntentType.QUERY_FRED)  # noqa: S101
+    intent_calls = [
+        call for call in service._test_ask_calls if call["prompt"] == intent_service.INTENT_PROMPT
+    ]
+    assert len(intent_calls) == 1  # noqa: S101
+
+
+def test_chatbot_reply_uses_semantic_cache_and_shares_embedding(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        chatbot_reply="I'm Fred.",
+    )
+    service._intent_cache = SemanticCache(threshold=0.9)
+    service._chatbot_cache = SemanticCache(threshold=0.95)
+    embeddings = {"who are you?": [1.0, 0.0], "who are you": [0.999, 0.01]}
+    embedded: list[str] = []
+
+    def fake_embed(text: str) -> list[float]:
+        embedded.append(text)
+        return embeddings[text]
+
+    monkeypatch.setattr(service, "_embed", fake_embed)
+
+    asyncio.run(service.process_user_message(make_request("who are you?")))
+    asyncio.run(service.process_user_message(make_request("who are you")))
+
+    chatbot_calls = [
+        call for call in service._test_ask_calls if call["prompt"] == intent_service.CHATBOT_PROMPT
+    ]
+    assert len(chatbot_calls) == 1  # noqa: S101
+    assert embedded == ["who are you?", "who are you"]  # noqa: S101
+    assert zulip.sent[-1]["content"] == "I'm Fred."  # noqa: S101
+
+
+def test_database_intent_generates_sql_once(monkeypatch, sql_service):
+    service, zulip, _, mysql, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        db_result="(1,)",
+        summary_text="There is one result.",
+    )
+
+    asyncio.run(service.process_user_message(make_request("how many?")))
+
+    prompts = [call["prompt"] for call in service._test_ask_calls]
+    assert prompts.count(sql_service.sql_prompt) == 1  # noqa: S101
+    assert mysql.last_query == "SELECT 1"  # noqa: S101
+    assert zulip.sent[-1]["content"] == "There is one result."  # noqa: S101
+    answer_calls = [c for c in service._test_ask_calls if c["prompt"] == sql_service.answer_prompt]
+    assert [c["bypass_cache"] for c in answer_calls] == [True]  # noqa: S101
+
+
+def test_repeated_question_reuses_cached_sql(monkeypatch, sql_service):
+    service, _, _, mysql, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        db_result="(1,)",
+        summary_text="There is one result.",
+    )
+
+    asyncio.run(service.query_fred(make_request("how many?").message, []))
+    asyncio.run(service.query_fred(make_request("how many?").message, []))
+
+    prompts = [call["prompt"] for call in service._test_ask_calls]
+    assert prompts.count(sql_service.sql_prompt) == 1  # noqa: S101
+    assert mysql.last_query == "SELECT 1"  # noqa: S101
+
+
+def test_unsafe_sql_is_not_cached(monkeypatch, sql_service):
+    service, _, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "DROP TABLE projects"}',
+    )
+
+    asyncio.run(service.query_fred(make_request("drop it").message, []))
+    asyncio.run(service.query_fred(make_request("drop it").message, []))
+
+    prompts = [call["prompt"] for call in service._test_ask_calls]
+    assert prompts.count(sql_service.sql_prompt) == 2  # noqa: S101
+
+
+def test_database_turn_reads_and_saves_history_once(monkeypatch, sql_service):
+    service, _, history, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        summary_text="There is one result.",
+    )
+    calls: list[str] = []
+    original_get, original_save = history.get, history.save
+    monkeypatch.setattr(history, "get", lambda email: calls.append("get") or original_get(email))
+    monkeypatch.setattr(
+        history,
+        "save",
+        lambda email, turns: calls.append("save") or original_save(email, turns),
+    )
+
+    asyncio.run(service.process_user_message(make_request("how many?")))
+
+    assert calls == ["get", "save"]  # noqa: S101
+    assert [turn["parts"] for turn in history.store["user@example.com"]] == [  # noqa: S101
+        ["how many?"],
+        ["There is one result."],
+    ]
+
+
+def test_plain_data_question_skips_classifier_call(monkeypatch, sql_service):
+    service, zulip, _, mysql, _ = build_service(
+        monkeypatch,
+        sql_service,
+        # The classifier would get this wrong; the fast path never asks it.
+        intent_label="converse_with_fred_bot",
+        sql_text='{"sql": "SELECT 1"}',
+        db_result="(1,)",
+        summary_text="There is one result.",
+    )
+
+    asyncio.run(service.process_user_message(make_request("How many projects?")))
+
+    prompts = [call["prompt"] for call in service._test_ask_calls]
+    assert intent_service.INTENT_PROMPT not in prompts  # noqa: S101
+    assert mysql.last_query == "SELECT 1"  # noqa: S101
+    assert zulip.sent[-1]["content"] == "There is one result."  # noqa: S101
+
+
+def test_streamed_chatbot_reply_is_edited_in_place(monkeypatch, sql_service):
+    service, zulip, history, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        stream_small_talk=True,
+    )
+    pieces = ["a" * 100, "b" * 100, "c" * 10]
+
+    async def fake_stream(self, **kwargs: Any):
+        for piece in pieces:
+            yield piece
+
+    monkeypatch.setattr(GeminiClient, "stream", fake_stream)
+
+    asyncio.run(service.process_user_message(make_request("hi")))
+
+    full_text = "".join(pieces)
+    contents = [entry["content"] for entry in zulip.sent]
+    assert contents == [  # noqa: S101
+        "thinking...",
+        "Figuring out the best way to help.",
+        "Drafting a reply about how I work.",
+        "a" * 100,
+    ]
+    assert zulip.updates == [(4, full_text)]  # noqa: S101
+    assert history.get("user@example.com")[-1]["parts"] == [full_text]  # noqa: S101
+
+
+def test_streamed_reply_falls_back_when_stream_fails_early(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="handle_unsupported_function",
+        other_reply="I can't do that.",
+        stream_small_talk=True,
+    )
+
+    async def broken_stream(self, **kwargs: Any):
+        raise RuntimeError("stream down")
+        yield ""  # pragma: no cover - makes this an async generator
+
+    monkeypatch.setattr(GeminiClient, "stream", broken_stream)
+
+    asyncio.run(service.process_user_message(make_request("book me a flight")))
+
+    assert zulip.sent[-1]["content"] == "I can't do that."  # noqa: S101
+    assert zulip.updates == []  # noqa: S101
+
+
+def test_streamed_reply_failing_midway_is_replaced_in_place(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="handle_unsupported_function",
+        other_reply="I can't do that.",
+        stream_small_talk=True,
+    )
+
+    async def failing_stream(self, **kwargs: Any):
+        yield "a" * 100
+        raise RuntimeError("stream dropped")
+
+    monkeypatch.setattr(GeminiClient, "stream", failing_stream)
+
+    asyncio.run(service.process_user_message(make_request("book me a flight")))
+
+    contents = [entry["content"] for entry in zulip.sent]
+    assert contents[-1] == "a" * 100  # noqa: S101
+    assert "I can't do that." not in contents  # noqa: S101
+    assert zulip.updates == [(len(contents), "I can't do that.")]  # noqa: S101
+
+
+def test_db_result_cache_reuses_recent_results(monkeypatch, sql_service):
+    service, _, _, mysql, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        db_result="(1,)",
+        summary_text="There is one result.",
+    )
+    queries: list[str] = []
+    original_aselect = mysql.aselect
+
+    async def counting_aselect(sql: str) -> str:
+        queries.append(sql)
+        return await original_aselect(sql)
+
+    monkeypatch.setattr(mysql, "aselect", counting_aselect)
+
+    asyncio.run(service.query_fred(make_request("how many?").message, []))
+    asyncio.run(service.query_fred(make_request("how many?").message, []))
+
+    assert queries == ["SELECT 1"]  # noqa: S101
+
+
+def test_chatbot_reply_served_from_faq_index(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        chatbot_reply="generated",
+    )
+    faq_index = FaqIndex([("Who are you?", "I'm Fred.")], threshold=0.9)
+    embeddings = {"Who are you?": [1.0, 0.0], "who are you": [0.99, 0.05]}
+    faq_index.build(embeddings.__getitem__)
+    service._faq_index = faq_index
+    monkeypatch.setattr(service, "_embed", embeddings.__getitem__)
+
+    asyncio.run(service.process_user_message(make_request("who are you")))
+    asyncio.run(service.process_user_message(make_request("who are you")))
+
+    chatbot_calls = [
+        call for call in service._test_ask_calls if call["prompt"] == intent_service.CHATBOT_PROMPT
+    ]
+    assert chatbot_calls == []  # noqa: S101
+    assert zulip.sent[-1]["content"] == "I'm Fred."  # noqa: S101
+
+
+def test_unbuilt_faq_index_is_skipped(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        chatbot_reply="generated",
+    )
+    service._faq_index = FaqIndex([("Who are you?", "I'm Fred.")], threshold=0.9)
+    monkeypatch.setattr(service, "_embed", lambda text: [1.0, 0.0])
+
+    asyncio.run(service.process_user_message(make_request("Who are you?")))
+
+    assert service._faq_index.built is False  # noqa: S101
+    assert zulip.sent[-1]["content"] == "generated"  # noqa: S101
+
+
+def test_query_fred_overlaps_progress_sends_with_model_calls(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        summary_text="One row.",
+    )
+    release = asyncio.Event()
+    original_send = zulip.send
+
+    async def slow_send(**kwargs: Any) -> int:
+        # Progress sends finish only after a model call has started.
+        await release.wait()
+        return await original_send(**kwargs)
+
+    original_ask = service._models.ask
+
+    async def ask_and_release(*args: Any, **kwargs: Any) -> Any:
+        release.set()
+        return await original_ask(*args, **kwargs)
+
+    monkeypatch.setattr(zulip, "send", slow_send)
+    monkeypatch.setattr(service._models, "ask", ask_and_release)
+
+    async def run() -> tuple[str, str, str]:
+        return await asyncio.wait_for(
+            service.query_fred(make_request("how many?").message, []), timeout=1
+        )
+
+    answer, sql_text, _ = asyncio.run(run())
+
+    assert (answer, sql_text) == ("One row.", "SELECT 1")  # noqa: S101
+    assert zulip.sent[0]["content"].startswith("Checking the database")  # noqa: S101
+
+
+def test_progress_updates_do_not_block_the_turn_and_stay_ordered(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="converse_with_fred_bot",
+        chatbot_reply="I'm Fred.",
+    )
+    release = asyncio.Event()
+    original_send = zulip.send
+
+    async def slow_send(**kwargs: Any) -> int:
+        # Zulip answers only once the chatbot model call has started.
+        await release.wait()
+        return await original_send(**kwargs)
+
+    original_ask = service._models.ask
+
+    async def ask_and_release(message: Any, prompt: str, *args: Any, **kwargs: Any) -> Any:
+        if prompt == intent_service.CHATBOT_PROMPT:
+            release.set()
+        return await original_ask(message, prompt, *args, **kwargs)
+
+    monkeypatch.setattr(zulip, "send", slow_send)
+    monkeypatch.setattr(service._models, "ask", ask_and_release)
+
+    async def run() -> None:
+        await asyncio.wait_for(service.process_user_message(make_request("who are you?")), 1)
+
+    asyncio.run(run())
+
+    contents = [sent["content"] for sent in zulip.sent]
+    assert contents[0] == "thinking..."  # noqa: S101
+    assert contents[-1] == "I'm Fred."  # noqa: S101
+    assert len(contents) >= 3  # noqa: S101
+
+
+def test_history_to_text_labels_roles_and_skips_empty_entries():
+    history = [
+        {"role": "user", "parts": ["how many", "projects?"]},
+        {"role": "model", "parts": ["", None]},
+        {"role": "model", "parts": ["There are 12."]},
+        {"parts": [3]},
+        {"role": "user"},
+    ]
+
+    assert QueryService._history_to_text(history) == (  # noqa: S101
+        "user: how many projects?\nassistant: There are 12.\nunknown: 3"
+    )
+
+
+def test_classify_intent_reuses_recent_intent_for_same_sender(monkeypatch, sql_service):
+    service, _, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+    )
+    message = make_request("projects in Kenya?").message
+    other_sender = message.model_copy(update={"sender_email": "other@example.com"})
+
+    asyncio.run(service.classify_intent(message))
+    asyncio.run(service.classify_intent(message))
+    asyncio.run(service.classify_intent(other_sender))
+
+    intent_calls = [
+        call for call in service._test_ask_calls if call["prompt"] == intent_service.INTENT_PROMPT
+    ]
+    assert len(intent_calls) == 2  # noqa: S101
+
+
+def test_recent_intent_is_not_reused_after_the_conversation_moved_on(monkeypatch, sql_service):
+    service, _, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+    )
+    message = make_request("yes").message
+
+    async def classify_after(bot_reply: str) -> None:
+        history = [
+            {"role": "model", "parts": [bot_reply]},
+            {"role": "user", "parts": [message.content]},
+        ]
+        token = model_gateway._turn_history.set(history)
+        try:
+            await service.classify_intent(message)
+        finally:
+            model_gateway._turn_history.reset(token)
+
+    asyncio.run(classify_after("Shall I count the projects?"))
+    asyncio.run(classify_after("Shall I count the projects?"))
+    asyncio.run(classify_after("Want to hear how I work?"))
+
+    intent_calls = [
+        call for call in service._test_ask_calls if call["prompt"] == intent_service.INTENT_PROMPT
+    ]
+    assert len(intent_calls) == 2  # noqa: S101
+
+
+def test_streamed_query_answer_uses_primary_model_without_history(monkeypatch, sql_service):
+    service, zulip, _, _, _ = build_service(
+        monkeypatch,
+        sql_service,
+        intent_label="query_fred",
+        sql_text='{"sql": "SELECT 1"}',
+        db_result="(1,)",
+        stream_answers=True,
+    )
+    stream_calls: list[dict[str, Any]] = []
+    pieces = ["There is ", "x" * 100, " one result."]
+
+    async def fake_stream(self, **kwargs: Any):
+        stream_calls.append(kwargs)
+        for piece in pieces:
+            yield piece
+
+    monkeypatch.setattr(GeminiClient, "stream", fake_stream)
+
+    asyncio.run(service.process_user_message(make_request("how many?")))
+
+    full_text = "".join(pieces)
+    assert stream_calls[0]["model_name"] == "gemini-2.5-pro"  # noqa: S101
+    assert stream_calls[0]["prompt"] == sql_service.answer_prompt  # noqa: S101
+    assert stream_calls[0]["history"] is None  # noqa: S101
+    assert zulip.sent[-1]["content"] == "There is " + "x" * 100  # noqa: S101
+    assert zulip.updates == [(len(zulip.sent), full_text)]  # noqa: S101
+
+
+def test_extract_relevant_history_keeps_newest_entries_within_limit(monkeypatch, sql_service):
+    service, _, _, _, _ = build_service(monkeypatch, sql_service, intent_label="query_fred")
+    service._queries._history_limit = 2
+    history = [
+        {"role": "user", "parts": ["oldest"]},
+        {"role": "model", "parts": ["older"]},
+        {"role": "system", "parts": ["ignored"]},
+        {"role": "user", "parts": []},
+        {"role": "user", "parts": ["newest"]},
+    ]
+
+    relevant = service._queries._extract_relevant_history_entries(history)
+
+    assert relevant == [history[1], history[4]]  # noqa: S101
+    assert relevant[1] is history[4]  # noqa: S101
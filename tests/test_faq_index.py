@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import orjson
+
+from fred_zulip_bot.services.faq_index import FaqIndex
+
+
+def test_faq_index_loads_json_and_answers_after_build(tmp_path) -> None:
+    path = tmp_path / "faq.json"
+    path.write_bytes(
+        orjson.dumps(
+            [
+                {"question": "Who are you?", "answer": "I'm Fred."},
+                {"question": "What data do you have?", "answer": "Bible translation data."},
+            ]
+        )
+    )
+    vectors = {"Who are you?": [1.0, 0.0], "What data do you have?": [0.0, 1.0]}
+
+    index = FaqIndex.from_json(path, threshold=0.9)
+    assert len(index) == 2  # noqa: S101
+    assert index.built is False  # noqa: S101
+
+    index.build(vectors.__getitem__)
+
+    assert index.built is True  # noqa: S101
+    assert index.lookup([0.99, 0.05]) == "I'm Fred."  # noqa: S101
+    assert index.lookup([0.1, 2.0]) == "Bible translation data."  # noqa: S101
+    assert index.lookup([1.0, 1.0]) is None  # noqa: S101
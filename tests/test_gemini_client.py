@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+from google.api_core import exceptions as api_exceptions
+from google.api_core.retry import AsyncRetry, if_transient_error
+
+from fred_zulip_bot.services import gemini_client as gemini_module
+from fred_zulip_bot.services import intent_service
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.sql_service import SqlService
+
+_FAST_RETRY = AsyncRetry(predicate=if_transient_error, initial=0.0, maximum=0.0, timeout=5.0)
+
+
+def build_client(monkeypatch: pytest.MonkeyPatch, **kwargs: Any) -> GeminiClient:
+    monkeypatch.setattr(GeminiClient, "_configure_genai", lambda self, api_key: None)
+    return GeminiClient(api_key="api-key", **kwargs)
+
+
+def test_generate_sends_history_through_async_chat_session(monkeypatch):
+    client = build_client(monkeypatch)
+    sent: list[tuple[list[dict[str, Any]], str]] = []
+
+    class FakeSession:
+        def __init__(self, history: list[dict[str, Any]]) -> None:
+            self.history = history
+
+        async def send_message_async(self, content: str, **_: Any) -> str:
+            sent.append((self.history, content))
+            return "reply"
+
+    class FakeModel:
+        def start_chat(self, history: list[dict[str, Any]]) -> FakeSession:
+            return FakeSession(history)
+
+    monkeypatch.setattr(
+        client,
+        "_create_model",
+        lambda *, model_name, prompt, generation_config=None: FakeModel(),
+    )
+    history = [{"role": "user", "parts": ["earlier"]}]
+
+    reply = asyncio.run(
+        client._generate(
+            model_name="m",
+            prompt="prompt",
+            content="hi",
+            history=history,
+            generation_config=None,
+        )
+    )
+
+    assert reply == "reply"  # noqa: S101
+    assert sent == [(history, "hi")]  # noqa: S101
+
+
+def test_create_model_uses_context_cache_for_sql_prompt_only(monkeypatch, tmp_path):
+    ddl = tmp_path / "schema.txt"
+    ddl.write_text("CREATE TABLE t (a int);\n" * 200)
+    rules = tmp_path / "rules.txt"
+    rules.write_text("rules")
+    sql_service = SqlService(ddl_path=ddl, rules_path=rules)
+
+    class FakeContextCache:
+        def __init__(self) -> None:
+            self.prompts: list[str] = []
+
+        def model_for(
+            self, *, model_name, system_instruction, generation_config=None, content_digest=None
+        ):
+            assert content_digest == sql_service.sql_prompt_digest  # noqa: S101
+            self.prompts.append(system_instruction)
+            return ("cached", model_name)
+
+    context_cache = FakeContextCache()
+    client = build_client(
+        monkeypatch,
+        context_cache=context_cache,
+        cached_prompt=sql_service.sql_prompt,
+        cached_prompt_digest=sql_service.sql_prompt_digest,
+    )
+
+    sql_model = client._create_model(model_name="m", prompt=sql_service.sql_prompt)
+    other_model = client._create_model(model_name="m", prompt=intent_service.CHATBOT_PROMPT)
+
+    assert sql_model == ("cached", "m")  # noqa: S101
+    assert other_model != ("cached", "m")  # noqa: S101
+    assert context_cache.prompts == [sql_service.sql_prompt]  # noqa: S101
+
+
+def test_create_model_reuses_pooled_instances(monkeypatch):
+    built: list[tuple[str, str]] = []
+
+    def fake_factory(*, model_name, system_instruction, generation_config=None):
+        built.append((model_name, system_instruction))
+        return object()
+
+    monkeypatch.setattr(gemini_module.genai, "GenerativeModel", fake_factory)
+    client = build_client(monkeypatch)
+
+    first = client._create_model(model_name="m", prompt="p", generation_config={"a": 1})
+    again = client._create_model(model_name="m", prompt="p", generation_config={"a": 1})
+    other_config = client._create_model(model_name="m", prompt="p")
+    other_model = client._create_model(model_name="n", prompt="p")
+
+    assert first is again  # noqa: S101
+    assert other_config is not first  # noqa: S101
+    assert other_model is not other_config  # noqa: S101
+    assert built == [("m", "p"), ("m", "p"), ("n", "p")]  # noqa: S101
+
+
+def test_stream_yields_text_chunks(monkeypatch):
+    client = build_client(monkeypatch, retry=_FAST_RETRY)
+
+    class Chunk:
+        def __init__(self, text: str | None) -> None:
+            self._text = text
+
+        @property
+        def text(self) -> str:
+            if self._text is None:
+                raise ValueError("no parts")
+            return self._text
+
+    class FakeStream:
+        def __aiter__(self):
+            return self._chunks()
+
+        async def _chunks(self):
+            for text in ("Hel", "lo", None):
+                yield Chunk(text)
+
+    calls: list[dict[str, Any]] = []
+
+    class FakeModel:
+        async def generate_content_async(self, content: str, **kwargs: Any):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise api_exceptions.ServiceUnavailable("busy")
+            return FakeStream()
+
+    monkeypatch.setattr(
+        client,
+        "_create_model",
+        lambda *, model_name, prompt, generation_config=None: FakeModel(),
+    )
+
+    async def collect() -> list[str]:
+        stream = client.stream(model_name="m", prompt="prompt", content="hi", history=None)
+        return [piece async for piece in stream]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]  # noqa: S101
+    # The transient error before the first chunk is retried with the same timeout.
+    expected = {"stream": True, "request_options": {"timeout": 30.0}}
+    assert calls == [expected, expected]  # noqa: S101
+
+
+def test_configure_genai_runs_once_per_api_key(monkeypatch):
+    configured: list[str] = []
+    monkeypatch.setattr(
+        gemini_module.genai, "configure", lambda *, api_key: configured.append(api_key)
+    )
+    gemini_module._configure_genai_once.cache_clear()
+
+    gemini_module._configure_genai_once("key-a")
+    gemini_module._configure_genai_once("key-a")
+    gemini_module._configure_genai_once("key-b")
+    gemini_module._configure_genai_once.cache_clear()
+
+    assert configured == ["key-a", "key-b"]  # noqa: S101
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from fred_zulip_bot.adapters import gemini_context_cache
+from fred_zulip_bot.adapters.gemini_context_cache import GeminiContextCache
+
+
+class DummyLogger:
+    def __init__(self) -> None:
+        self.errors: list[str] = []
+
+    def info(self, message: str, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def error(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.errors.append(message)
+
+
+def fake_genai(created: list[dict[str, Any]], *, fail: bool = False) -> SimpleNamespace:
+    def create(**kwargs: Any) -> str:
+        if fail:
+            raise RuntimeError("caching unsupported")
+        created.append(kwargs)
+        return f"cache-{len(created)}"
+
+    def from_cached_content(cached_content: str, *, generation_config: Any = None) -> Any:
+        return ("model", cached_content, generation_config)
+
+    return SimpleNamespace(
+        caching=SimpleNamespace(CachedContent=SimpleNamespace(create=create)),
+        GenerativeModel=SimpleNamespace(from_cached_content=from_cached_content),
+    )
+
+
+def test_context_cache_reuses_handle_until_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[dict[str, Any]] = []
+    monkeypatch.setattr(gemini_context_cache, "genai", fake_genai(created))
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(gemini_context_cache.time, "monotonic", lambda: clock["now"])
+    cache = GeminiContextCache(ttl=timedelta(minutes=10))
+
+    first = cache.model_for(model_name="gemini-2.5-pro", system_instruction="schema")
+    second = cache.model_for(
+        model_name="gemini-2.5-pro", system_instruction="schema", generation_config={"a": 1}
+    )
+
+    assert first == ("model", "cache-1", None)  # noqa: S101
+    assert second == ("model", "cache-1", {"a": 1})  # noqa: S101
+    assert created[0]["model"] == "models/gemini-2.5-pro"  # noqa: S101
+    assert created[0]["ttl"] == timedelta(minutes=10)  # noqa: S101
+
+    clock["now"] += 600
+    third = cache.model_for(model_name="gemini-2.5-pro", system_instruction="schema")
+
+    assert third == ("model", "cache-2", None)  # noqa: S101
+
+
+def test_context_cache_backs_off_after_failure(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[dict[str, Any]] = []
+    monkeypatch.setattr(gemini_context_cache, "genai", fake_genai(created, fail=True))
+    logger = DummyLogger()
+    cache = GeminiContextCache(logger=logger)
+
+    assert cache.model_for(model_name="m", system_instruction="p") is None  # noqa: S101
+    assert cache.model_for(model_name="m", system_instruction="p") is None  # noqa: S101
+    assert len(logger.errors) == 1  # noqa: S101
+
+
+def test_context_cache_keys_by_supplied_digest(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[dict[str, Any]] = []
+    monkeypatch.setattr(gemini_context_cache, "genai", fake_genai(created))
+    cache = GeminiContextCache()
+
+    first = cache.model_for(model_name="m", system_instruction="schema", content_digest="abc")
+    second = cache.model_for(model_name="m", system_instruction="schema", content_digest="abc")
+    changed = cache.model_for(model_name="m", system_instruction="schema", content_digest="def")
+
+    assert first == second == ("model", "cache-1", None)  # noqa: S101
+    assert changed == ("model", "cache-2", None)  # noqa: S101
+
+
+def test_context_cache_extends_ttl_ahead_of_expiry(monkeypatch: pytest.MonkeyPatch) -> None:
+    class Handle:
+        def __init__(self) -> None:
+            self.updates: list[timedelta | None] = []
+
+        def update(self, *, ttl: timedelta | None = None) -> None:
+            self.updates.append(ttl)
+
+    handles: list[Handle] = []
+
+    def create(**kwargs: Any) -> Handle:
+        handles.append(Handle())
+        return handles[-1]
+
+    monkeypatch.setattr(
+        gemini_context_cache,
+        "genai",
+        SimpleNamespace(
+            caching=SimpleNamespace(CachedContent=SimpleNamespace(create=create)),
+            GenerativeModel=SimpleNamespace(
+                from_cached_content=lambda cached_content, generation_config=None: cached_content
+            ),
+        ),
+    )
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(gemini_context_cache.time, "monotonic", lambda: clock["now"])
+    cache = GeminiContextCache(ttl=timedelta(hours=1))
+
+    first = cache.model_for(model_name="m", system_instruction="schema")
+    clock["now"] += 3600 - 60 - 100  # inside the refresh window, before expiry
+    second = cache.model_for(model_name="m", system_instruction="schema")
+    deadline = time.perf_counter() + 2
+    while cache._refreshing and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    clock["now"] += 200  # past the original expiry
+    third = cache.model_for(model_name="m", system_instruction="schema")
+
+    assert first is second is third is handles[0]  # noqa: S101
+    assert len(handles) == 1  # noqa: S101
+    assert handles[0].updates == [timedelta(hours=1)]  # noqa: S101
+
+
+def test_context_cache_reuses_bound_models_per_handle(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[dict[str, Any]] = []
+    genai = fake_genai(created)
+    bound: list[Any] = []
+    from_cached_content = genai.GenerativeModel.from_cached_content
+
+    def counting_from_cached_content(cached_content: str, *, generation_config: Any = None) -> Any:
+        bound.append(cached_content)
+        return from_cached_content(cached_content, generation_config=generation_config)
+
+    genai.GenerativeModel.from_cached_content = counting_from_cached_content
+    monkeypatch.setattr(gemini_context_cache, "genai", genai)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(gemini_context_cache.time, "monotonic", lambda: clock["now"])
+    cache = GeminiContextCache(ttl=timedelta(minutes=10))
+
+    first = cache.model_for(model_name="m", system_instruction="p", generation_config={"a": 1})
+    again = cache.model_for(model_name="m", system_instruction="p", generation_config={"a": 1})
+    other = cache.model_for(model_name="m", system_instruction="p")
+    clock["now"] += 600
+    renewed = cache.model_for(model_name="m", system_instruction="p", generation_config={"a": 1})
+
+    assert first is again  # noqa: S101
+    assert other == ("model", "cache-1", None)  # noqa: S101
+    assert renewed == ("model", "cache-2", {"a": 1})  # noqa: S101
+    assert bound == ["cache-1", "cache-1", "cache-2"]  # noqa: S101
+
+
+def test_context_cache_create_does_not_block_other_prompts(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    entered = threading.Event()
+    release = threading.Event()
+    created: list[str] = []
+
+    def create(*, system_instruction: str, **_: Any) -> str:
+        if system_instruction == "slow":
+            entered.set()
+            if not release.wait(timeout=2):
+                raise RuntimeError("create was never released")
+        created.append(system_instruction)
+        return f"cache-{system_instruction}"
+
+    monkeypatch.setattr(
+        gemini_context_cache,
+        "genai",
+        SimpleNamespace(
+            caching=SimpleNamespace(CachedContent=SimpleNamespace(create=create)),
+            GenerativeModel=SimpleNamespace(
+                from_cached_content=lambda cached_content, generation_config=None: cached_content
+            ),
+        ),
+    )
+    cache = GeminiContextCache(ttl=timedelta(hours=1))
+    assert cache.model_for(model_name="m", system_instruction="fast") == "cache-fast"  # noqa: S101
+
+    results: list[Any] = []
+    slow_calls = [
+        threading.Thread(
+            target=lambda: results.append(
+                cache.model_for(model_name="m", system_instruction="slow")
+            )
+        )
+        for _ in range(2)
+    ]
+    for thread in slow_calls:
+        thread.start()
+    assert entered.wait(timeout=2)  # noqa: S101
+    # Served while the slow create is still in flight.
+    assert cache.model_for(model_name="m", system_instruction="fast") == "cache-fast"  # noqa: S101
+    release.set()
+    for thread in slow_calls:
+        thread.join(timeout=5)
+
+    assert results == ["cache-slow", "cache-slow"]  # noqa: S101
+    assert created == ["fast", "slow"]  # noqa: S101
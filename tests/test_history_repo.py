@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
 from pathlib import Path
+from typing import Any
 
+from tinydb.table import Document
+
+from fred_zulip_bot.adapters.history_repo.orjson_storage import OrjsonStorage
+from fred_zulip_bot.adapters.history_repo.sqlite_repo import SqliteHistoryRepo
 from fred_zulip_bot.adapters.history_repo.tinydb_repo import TinyDbHistoryRepo
+from fred_zulip_bot.adapters.history_repo.write_behind import WriteBehindHistoryRepo
 
 
 class DummyLogger:
@@ -12,6 +21,9 @@ class DummyLogger:
     def warning(self, message: str, *args, **kwargs) -> None:
         self.messages.append(message % args if args else message)
 
+    def info(self, message: str, *args, **kwargs) -> None:
+        self.messages.append(message % args if args else message)
+
 
 def test_tinydb_history_repo_roundtrip(tmp_path: Path) -> None:
     repo = TinyDbHistoryRepo(tmp_path / "history.json", max_length=2, logger=DummyLogger())
@@ -36,7 +48,256 @@ def test_tinydb_history_repo_handles_malformed(tmp_path: Path) -> None:
     logger = DummyLogger()
     repo = TinyDbHistoryRepo(tmp_path / "history.json", max_length=2, logger=logger)
 
-    repo._table.insert({"email": "user@example.com", "history": "oops"})
+    repo._table.insert(
+        Document(
+            {"email": "user@example.com", "history": "oops"},
+            doc_id=repo._doc_id("user@example.com"),
+        )
+    )
 
     assert repo.get("user@example.com") == []  # noqa: S101
     assert logger.messages  # noqa: S101
+
+
+def test_tinydb_history_repo_reads_stdlib_json_file(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.json"
+    legacy = {
+        "history": {
+            "1": {"email": "user@example.com", "history": [{"role": "user", "parts": ["hi"]}]}
+        }
+    }
+    db_path.write_text(json.dumps(legacy, indent=2))
+
+    repo = TinyDbHistoryRepo(db_path, max_length=2, logger=DummyLogger())
+
+    assert repo.get("user@example.com") == [{"role": "user", "parts": ["hi"]}]  # noqa: S101
+
+
+def test_tinydb_history_repo_rekeys_legacy_records(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.json"
+    legacy = {"history": {"1": {"email": "user@example.com", "history": []}}}
+    db_path.write_text(json.dumps(legacy))
+
+    repo = TinyDbHistoryRepo(db_path, max_length=2, logger=DummyLogger())
+
+    stored = json.loads(db_path.read_text())["history"]
+    assert list(stored) == [str(repo._doc_id("user@example.com"))]  # noqa: S101
+
+
+def test_tinydb_history_repo_creates_file_on_flush(tmp_path: Path) -> None:
+    db_path = tmp_path / "nested" / "history.json"
+    repo = TinyDbHistoryRepo(db_path, max_length=2, logger=DummyLogger())
+
+    assert repo.get("user@example.com") == []  # noqa: S101
+
+    repo.save("user@example.com", [{"role": "user", "parts": ["hi"]}])
+    assert not db_path.exists()  # noqa: S101
+
+    repo.flush()
+
+    assert db_path.exists()  # noqa: S101
+
+
+def test_tinydb_history_repo_flushes_on_a_timer(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.json"
+    repo = TinyDbHistoryRepo(db_path, flush_interval=0.01, logger=DummyLogger())
+
+    repo.save("user@example.com", [{"role": "user", "parts": ["hi"]}])
+    deadline = time.perf_counter() + 2.0
+    while not db_path.exists() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    stored = json.loads(db_path.read_text())["history"]
+    assert [doc["history"] for doc in stored.values()] == [  # noqa: S101
+        [{"role": "user", "parts": ["hi"]}]
+    ]
+    repo.close()
+
+
+def test_tinydb_history_repo_close_persists_pending_writes(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.json"
+    repo = TinyDbHistoryRepo(db_path, max_length=2, logger=DummyLogger())
+    repo.save("user@example.com", [{"role": "user", "parts": ["hi"]}])
+    repo.close()
+
+    reopened = TinyDbHistoryRepo(db_path, max_length=2, logger=DummyLogger())
+
+    assert reopened.get("user@example.com") == [{"role": "user", "parts": ["hi"]}]  # noqa: S101
+
+
+def test_tinydb_history_repo_serves_repeat_reads_from_cache(tmp_path: Path) -> None:
+    repo = TinyDbHistoryRepo(tmp_path / "history.json", max_length=2, logger=DummyLogger())
+    repo.save("user@example.com", [{"role": "user", "parts": ["hi"]}])
+
+    def fail(*args, **kwargs):  # pragma: no cover - must not be reached
+        raise AssertionError("store should not be queried on a cache hit")
+
+    repo._table.get = fail  # type: ignore[method-assign]
+
+    first = repo.get("user@example.com")
+    first.append({"role": "model", "parts": ["mutated"]})
+
+    assert repo.get("user@example.com") == [{"role": "user", "parts": ["hi"]}]  # noqa: S101
+
+
+def test_tinydb_history_repo_cache_evicts_least_recent(tmp_path: Path) -> None:
+    repo = TinyDbHistoryRepo(
+        tmp_path / "history.json", max_length=2, cache_size=1, logger=DummyLogger()
+    )
+    repo.save("a@example.com", [{"role": "user", "parts": ["a"]}])
+    repo.save("b@example.com", [{"role": "user", "parts": ["b"]}])
+
+    assert list(repo._cache) == ["b@example.com"]  # noqa: S101
+    assert repo.get("a@example.com") == [{"role": "user", "parts": ["a"]}]  # noqa: S101
+
+
+def test_orjson_storage_replaces_file_atomically(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.json"
+    db_path.write_text("stale")
+    storage = OrjsonStorage(db_path)
+
+    storage.write({"history": {"1": {"email": "user@example.com", "history": []}}})
+
+    assert json.loads(db_path.read_text())["history"]["1"]["history"] == []  # noqa: S101
+    assert [path.name for path in tmp_path.iterdir()] == ["history.json"]  # noqa: S101
+
+
+def test_sqlite_history_repo_roundtrip(tmp_path: Path) -> None:
+    db_path = tmp_path / "history.sqlite3"
+    repo = SqliteHistoryRepo(db_path, max_length=2)
+
+    repo.save("user@example.com", [{"role": "user", "parts": [str(i)]} for i in range(3)])
+    repo.save("user@example.com", [{"role": "user", "parts": ["latest"]}])
+    repo.close()
+
+    reopened = SqliteHistoryRepo(db_path, max_length=2)
+    assert reopened.get("user@example.com") == [  # noqa: S101
+        {"role": "user", "parts": ["latest"]}
+    ]
+    assert reopened.get("missing@example.com") == []  # noqa: S101
+    journal_mode = reopened._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "wal"  # noqa: S101
+
+
+def test_sqlite_history_repo_handles_malformed(tmp_path: Path) -> None:
+    logger = DummyLogger()
+    repo = SqliteHistoryRepo(tmp_path / "history.sqlite3", logger=logger)
+    repo._conn.execute(
+        "INSERT INTO history (email, data) VALUES (?, ?)", ("user@example.com", b"not json")
+    )
+
+    assert repo.get("user@example.com") == []  # noqa: S101
+    assert logger.messages  # noqa: S101
+
+
+def test_tinydb_history_repo_does_not_alias_saved_list(tmp_path: Path) -> None:
+    repo = TinyDbHistoryRepo(tmp_path / "history.json", max_length=5)
+    history = [{"role": "user", "parts": ["hi"]}]
+
+    repo.save("user@example.com", history)
+    history.append({"role": "model", "parts": ["hello"]})
+
+    assert repo.get("user@example.com") == [{"role": "user", "parts": ["hi"]}]  # noqa: S101
+
+
+def test_tinydb_history_repo_skips_unchanged_save(tmp_path: Path) -> None:
+    repo = TinyDbHistoryRepo(tmp_path / "history.json", max_length=5)
+    history = [{"role": "user", "parts": ["hi"]}]
+    repo.save("user@example.com", history)
+
+    def fail_upsert(*args, **kwargs):  # pragma: no cover - must not run
+        raise AssertionError("unchanged history should not be written")
+
+    repo._table.upsert = fail_upsert  # type: ignore[method-assign]
+
+    repo.save("user@example.com", list(history))
+
+
+def test_sqlite_history_repo_skips_unchanged_save(tmp_path: Path) -> None:
+    repo = SqliteHistoryRepo(tmp_path / "history.sqlite3")
+    history = [{"role": "user", "parts": ["hi"]}]
+    repo.save("user@example.com", history)
+    writes = repo._conn.total_changes
+
+    repo.save("user@example.com", list(history))
+    assert repo._conn.total_changes == writes  # noqa: S101
+
+    repo.save("user@example.com", [*history, {"role": "model", "parts": ["hello"]}])
+    assert repo._conn.total_changes == writes + 1  # noqa: S101
+    assert len(repo.get("user@example.com")) == 2  # noqa: S101
+
+
+class RecordingRepo:
+    def __init__(self) -> None:
+        self.store: dict[str, list[dict[str, Any]]] = {}
+        self.saves: list[list[dict[str, Any]]] = []
+        self.closed = False
+
+    def get(self, email: str) -> list[dict[str, Any]]:
+        return list(self.store.get(email, []))
+
+    def save(self, email: str, history: list[dict[str, Any]]) -> None:
+        self.saves.append(list(history))
+        self.store[email] = list(history)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_write_behind_repo_coalesces_and_reads_pending() -> None:
+    inner = RecordingRepo()
+    repo = WriteBehindHistoryRepo(inner)
+
+    async def scenario() -> list[dict[str, Any]]:
+        repo.save("user@example.com", [{"role": "user", "parts": ["a"]}])
+        repo.save("user@example.com", [{"role": "user", "parts": ["b"]}])
+        seen = repo.get("user@example.com")
+        await repo.aclose()
+        return seen
+
+    seen = asyncio.run(scenario())
+
+    assert seen == [{"role": "user", "parts": ["b"]}]  # noqa: S101
+    assert inner.saves == [[{"role": "user", "parts": ["b"]}]]  # noqa: S101
+    assert inner.closed is True  # noqa: S101
+    assert repo.get("user@example.com") == [{"role": "user", "parts": ["b"]}]  # noqa: S101
+
+
+def test_write_behind_repo_debounces_a_burst_of_saves() -> None:
+    inner = RecordingRepo()
+    repo = WriteBehindHistoryRepo(inner, delay=0.01)
+
+    async def scenario() -> None:
+        repo.save("user@example.com", [{"role": "user", "parts": ["a"]}])
+        await asyncio.sleep(0)
+        repo.save("user@example.com", [{"role": "user", "parts": ["b"]}])
+        await repo.aclose()
+
+    asyncio.run(scenario())
+
+    assert inner.saves == [[{"role": "user", "parts": ["b"]}]]  # noqa: S101
+
+
+def test_history_repos_offer_async_access(tmp_path: Path) -> None:
+    tinydb = TinyDbHistoryRepo(tmp_path / "history.json", flush_interval=0)
+    behind = WriteBehindHistoryRepo(RecordingRepo(), delay=0.01)
+    history = [{"role": "user", "parts": ["hi"]}]
+
+    async def scenario() -> list[list[dict[str, Any]]]:
+        await tinydb.asave("user@example.com", history)
+        await behind.asave("user@example.com", history)
+        seen = [await tinydb.aget("user@example.com"), await behind.aget("user@example.com")]
+        await behind.aclose()
+        seen.append(await behind.aget("user@example.com"))
+        return seen
+
+    assert asyncio.run(scenario()) == [history, history, history]  # noqa: S101
+
+
+def test_write_behind_repo_writes_through_without_loop() -> None:
+    inner = RecordingRepo()
+    repo = WriteBehindHistoryRepo(inner)
+
+    repo.save("user@example.com", [{"role": "user", "parts": ["a"]}])
+
+    assert inner.saves == [[{"role": "user", "parts": ["a"]}]]  # noqa: S101
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 
-from fred_zulip_bot.services.intent_service import IntentType, classify_intent
+import pytest
+
+from fred_zulip_bot.services.intent_service import (
+    IntentType,
+    classify_intent,
+    fast_classify,
+)
 
 
 @dataclass
@@ -11,7 +18,7 @@ class DummyReply:
 
 
 def make_asker(result: str):
-    def ask(prompt: str, use_history: bool) -> DummyReply:
+    async def ask(prompt: str, use_history: bool) -> DummyReply:
         assert use_history is True  # noqa: S101
         return DummyReply(result)
 
@@ -19,15 +26,52 @@ def make_asker(result: str):
 
 
 def test_classify_intent_database_label() -> None:
-    intent = classify_intent(make_asker("query_fred"))
+    intent = asyncio.run(classify_intent(make_asker("query_fred")))
     assert intent is IntentType.QUERY_FRED  # noqa: S101
 
 
 def test_classify_intent_trims_and_lowercases() -> None:
-    intent = classify_intent(make_asker("  CoNvErSe_With_Fred_Bot\n"))
+    intent = asyncio.run(classify_intent(make_asker("  CoNvErSe_With_Fred_Bot\n")))
     assert intent is IntentType.CONVERSE_WITH_FRED_BOT  # noqa: S101
 
 
 def test_classify_intent_defaults_to_other() -> None:
-    intent = classify_intent(make_asker("something else"))
+    intent = asyncio.run(classify_intent(make_asker("something else")))
     assert intent is IntentType.HANDLE_UNSUPPORTED_FUNCTION  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "How many projects are active in Kenya?",
+        "list the languages in India",
+        "Show me translation products completed this year",
+        "which countries have the most UPGs?",
+    ],
+)
+def test_fast_classify_recognises_plain_data_questions(text: str) -> None:
+    assert fast_classify(text) is IntentType.QUERY_FRED  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "How many languages can you speak?",
+        "who are you tracking in the projects table?",
+        "What are you able to tell me about Kenya?",
+        "what can you do for Papua New Guinea",
+        "who built you and how many projects are there?",
+        "how many of those are in Africa?",
+        "tell me a joke about books",
+    ],
+)
+def test_fast_classify_defers_to_model(text: str) -> None:
+    assert fast_classify(text) is None  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["what's your name?", "Who are you?", "what can you do", "  Who built you?! "],
+)
+def test_fast_classify_recognises_questions_about_the_bot(text: str) -> None:
+    assert fast_classify(text) is IntentType.CONVERSE_WITH_FRED_BOT  # noqa: S101
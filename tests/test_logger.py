@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import logging
+import queue
+
+import orjson
+
+from logger import BoundedQueueHandler, JsonFormatter
+
+
+def test_queued_exception_keeps_traceback_in_its_own_field() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(10)
+    test_logger = logging.getLogger("test_logger.json")
+    test_logger.propagate = False
+    test_logger.addHandler(BoundedQueueHandler(log_queue))
+
+    try:
+        raise ZeroDivisionError("boom")
+    except ZeroDivisionError:
+        test_logger.error("failed for %s", "user", exc_info=True)
+
+    payload = orjson.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+    assert set(payload) == {"ts", "level", "logger", "message", "exc_info"}  # noqa: S101
+    assert payload["message"] == "failed for user"  # noqa: S101
+    assert payload["level"] == "ERROR"  # noqa: S101
+    assert "ZeroDivisionError: boom" in payload["exc_info"]  # noqa: S101
+
+
+def test_full_queue_drops_records_and_reports_the_count() -> None:
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(2)
+    test_logger = logging.getLogger("test_logger.bounded")
+    test_logger.propagate = False
+    test_logger.addHandler(BoundedQueueHandler(log_queue))
+
+    for text in ("a", "b", "c", "d"):
+        test_logger.warning(text)
+    drained = [log_queue.get_nowait().getMessage() for _ in range(2)]
+    test_logger.warning("e")
+
+    assert drained == ["a", "b"]  # noqa: S101
+    notice = log_queue.get_nowait()
+    assert notice.levelno == logging.WARNING  # noqa: S101
+    assert notice.getMessage() == "dropped=2 log records while the log queue was full"  # noqa: S101
+    assert log_queue.get_nowait().getMessage() == "e"  # noqa: S101
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from google.api_core import exceptions as api_exceptions
+from google.api_core.retry import AsyncRetry, if_transient_error
+
+from fred_zulip_bot.adapters.history_repo.base import HistoryRepository
+from fred_zulip_bot.core.models import ZulipMessage
+from fred_zulip_bot.services.gemini_client import GeminiClient
+from fred_zulip_bot.services.model_gateway import ModelGateway
+
+
+@dataclass
+class FakeHistoryRepo(HistoryRepository):
+    store: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+
+    def get(self, email: str) -> list[dict[str, Any]]:
+        return list(self.store.get(email, []))
+
+    def save(self, email: str, history: list[dict[str, Any]]) -> None:
+        self.store[email] = list(history)
+
+
+class DummyLogger:
+    def __init__(self) -> None:
+        self.errors: list[str] = []
+
+    def info(self, message: str, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def error(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.errors.append(message)
+
+
+def make_reply(text: str) -> Any:
+    part = type("Content", (), {"parts": [text]})()
+    candidate = type("Candidate", (), {"content": part})()
+    return type("Reply", (), {"candidates": [candidate], "text": text})()
+
+
+def make_message(content: str = "hi") -> ZulipMessage:
+    return ZulipMessage(
+        content=content,
+        display_recipient="stream",
+        sender_email="user@example.com",
+        subject="topic",
+        type="stream",
+    )
+
+
+def build_gateway(
+    monkeypatch: pytest.MonkeyPatch,
+    *,
+    history_repo: FakeHistoryRepo | None = None,
+    retry: AsyncRetry | None = None,
+    **kwargs: Any,
+) -> ModelGateway:
+    monkeypatch.setattr(GeminiClient, "_configure_genai", lambda self, api_key: None)
+    gemini = GeminiClient(api_key="api-key", **({"retry": retry} if retry else {}))
+    return ModelGateway(
+        gemini=gemini,
+        history_repo=history_repo or FakeHistoryRepo(),
+        logger=DummyLogger(),
+        **kwargs,
+    )
+
+
+def test_ask_falls_back_with_native_async_calls(monkeypatch):
+    gateway = build_gateway(monkeypatch)
+    calls: list[str] = []
+
+    class FakeModel:
+        def __init__(self, model_name: str) -> None:
+            self.model_name = model_name
+
+        async def generate_content_async(self, content: str, **_: Any) -> Any:
+            calls.append(self.model_name)
+            if self.model_name == "gemini-2.5-pro":
+                raise RuntimeError("primary down")
+            return make_reply("ok")
+
+    monkeypatch.setattr(
+        gateway._gemini,
+        "_create_model",
+        lambda *, model_name, prompt, generation_config=None: FakeModel(model_name),
+    )
+
+    text = asyncio.run(gateway.ask_text(make_message(), "prompt"))
+
+    assert text == "ok"  # noqa: S101
+    assert calls == ["gemini-2.5-pro", "gemini-2.5-flash"]  # noqa: S101
+
+
+def test_ask_reuses_cached_reply(monkeypatch):
+    gateway = build_gateway(monkeypatch)
+    generated: list[str] = []
+
+    async def fake_generate(**kwargs: Any) -> Any:
+        generated.append(kwargs["content"])
+        return make_reply(kwargs["content"])
+
+    monkeypatch.setattr(gateway._gemini, "generate", fake_generate)
+    message = make_message()
+
+    async def ask_twice() -> tuple[str, str, str]:
+        first = await gateway.ask_text(message, "prompt")
+        second = await gateway.ask_text(message, "prompt")
+        other = await gateway.ask_text(message, "other prompt")
+        return first, second, other
+
+    assert asyncio.run(ask_twice()) == ("hi", "hi", "hi")  # noqa: S101
+    assert generated == ["hi", "hi"]  # noqa: S101
+
+    asyncio.run(gateway.ask_text(message, "prompt", bypass_cache=True))
+    assert generated == ["hi", "hi", "hi"]  # noqa: S101
+
+
+def test_model_history_drops_current_message_and_caps_turns(monkeypatch):
+    history = FakeHistoryRepo()
+    gateway = build_gateway(monkeypatch, history_repo=history, model_history_turns=2)
+    history.store["user@example.com"] = [
+        {"role": "user", "parts": ["one"]},
+        {"role": "model", "parts": ["two"]},
+        {"role": "user", "parts": ["three"]},
+        {"role": "model", "parts": ["four"]},
+        {"role": "user", "parts": ["hi"]},
+    ]
+
+    sent = asyncio.run(gateway.model_history(make_message()))
+
+    assert sent == [  # noqa: S101
+        {"role": "user", "parts": ["three"]},
+        {"role": "model", "parts": ["four"]},
+    ]
+
+
+def test_model_history_reads_the_turn_history_inside_a_conversation(monkeypatch):
+    history = FakeHistoryRepo()
+    gateway = build_gateway(monkeypatch, history_repo=history)
+    turn = [{"role": "model", "parts": ["earlier"]}, {"role": "user", "parts": ["hi"]}]
+
+    async def read() -> list[dict[str, Any]]:
+        with gateway.conversation(turn):
+            return await gateway.model_history(make_message())
+
+    assert asyncio.run(read()) == [{"role": "model", "parts": ["earlier"]}]  # noqa: S101
+    assert gateway.turn_history() is None  # noqa: S101
+
+
+def test_ask_fallback_loads_history_once(monkeypatch):
+    history_repo = FakeHistoryRepo()
+    history_repo.save("user@example.com", [{"role": "user", "parts": ["earlier"]}])
+    reads: list[str] = []
+    original_get = history_repo.get
+
+    def counting_get(email: str) -> list[dict[str, Any]]:
+        reads.append(email)
+        return original_get(email)
+
+    monkeypatch.setattr(history_repo, "get", counting_get)
+    gateway = build_gateway(monkeypatch, history_repo=history_repo)
+    attempts: list[str] = []
+
+    async def failing_generate(**kwargs: Any) -> Any:
+        attempts.append(kwargs["model_name"])
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(gateway._gemini, "generate", failing_generate)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(gateway.ask(make_message(), "prompt", True))
+
+    assert attempts == ["gemini-2.5-pro", "gemini-2.5-flash"]  # noqa: S101
+    assert reads == ["user@example.com"]  # noqa: S101
+
+
+def test_ask_retries_transient_errors_before_falling_back(monkeypatch):
+    gateway = build_gateway(
+        monkeypatch,
+        retry=AsyncRetry(predicate=if_transient_error, initial=0.0, maximum=0.0, timeout=5.0),
+    )
+    calls: list[str] = []
+
+    class FakeModel:
+        def __init__(self, model_name: str) -> None:
+            self.model_name = model_name
+
+        async def generate_content_async(self, content: str, **_: Any) -> Any:
+            calls.append(self.model_name)
+            if len(calls) == 1:
+                raise api_exceptions.ServiceUnavailable("busy")
+            if self.model_name == "gemini-2.5-pro" and len(calls) == 2:
+                raise api_exceptions.InvalidArgument("bad request")
+            return make_reply("ok")
+
+    monkeypatch.setattr(
+        gateway._gemini,
+        "_create_model",
+        lambda *, model_name, prompt, generation_config=None: FakeModel(model_name),
+    )
+
+    text = asyncio.run(gateway.ask_text(make_message(), "prompt"))
+
+    assert text == "ok"  # noqa: S101
+    # One transient retry on the primary, no retry of the 4xx, then the fallback model.
+    assert calls == ["gemini-2.5-pro", "gemini-2.5-pro", "gemini-2.5-flash"]  # noqa: S101
+
+
+def test_ask_coalesces_identical_concurrent_calls(monkeypatch):
+    gateway = build_gateway(monkeypatch, response_cache_size=0)
+    calls: list[str] = []
+
+    class FakeModel:
+        async def generate_content_async(self, content: str, **_: Any) -> Any:
+            calls.append(content)
+            await asyncio.sleep(0.01)
+            return make_reply("ok")
+
+    monkeypatch.setattr(
+        gateway._gemini,
+        "_create_model",
+        lambda *, model_name, prompt, generation_config=None: FakeModel(),
+    )
+    message = make_message()
+
+    async def run() -> list[str]:
+        ask = gateway.ask_text
+        abandoned = asyncio.create_task(ask(message, "prompt", use_history=False))
+        kept = asyncio.create_task(ask(message, "prompt", use_history=False))
+        other = asyncio.create_task(ask(message, "other prompt", use_history=False))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        return [await kept, await other]
+
+    assert asyncio.run(run()) == ["ok", "ok"]  # noqa: S101
+    assert calls == ["hi", "hi"]  # noqa: S101
+    assert gateway._inflight == {}  # noqa: S101
@@ -1,25 +1,31 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
 from typing import Any
 
 import pytest
 
-from fred_zulip_bot.adapters.mysql_client import MySqlClient
+from fred_zulip_bot.adapters.mysql_client import MySqlClient, with_row_limit
 
 
 class DummyCursor:
     def __init__(self, rows: list[tuple[Any, ...]]) -> None:
         self._rows = rows
         self.executed_sql: str | None = None
+        self.closed = False
 
     def execute(self, sql: str) -> None:
         self.executed_sql = sql
 
-    def fetchall(self) -> list[tuple[Any, ...]]:
-        return self._rows
+    def fetchmany(self, size: int) -> list[tuple[Any, ...]]:
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
 
-    def close(self) -> None:  # pragma: no cover - no behavior
-        pass
+    def close(self) -> None:
+        self.closed = True
 
 
 class DummyConnection:
@@ -35,6 +41,30 @@ class DummyConnection:
         self.closed = True
 
 
+class DummyPool:
+    created = 0
+
+    def __init__(self, connection: DummyConnection, **kwargs: Any) -> None:
+        DummyPool.created += 1
+        self.connection = connection
+        self.kwargs = kwargs
+        self.drained = False
+
+    def _remove_connections(self) -> int:
+        self.drained = True
+        return 0
+
+    def get_connection(self) -> DummyConnection:
+        return self.connection
+
+
+def fake_connector(connection: DummyConnection) -> SimpleNamespace:
+    def make_pool(**kwargs: Any) -> DummyPool:
+        return DummyPool(connection, **kwargs)
+
+    return SimpleNamespace(pooling=SimpleNamespace(MySQLConnectionPool=make_pool))
+
+
 class DummyLogger:
     def __init__(self) -> None:
         self.logged = False
@@ -48,7 +78,7 @@ def test_mysql_client_select_success(monkeypatch: pytest.MonkeyPatch) -> None:
     connection = DummyConnection(rows)
     monkeypatch.setattr(
         "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
-        type("Connector", (), {"connect": staticmethod(lambda **kwargs: connection)}),
+        fake_connector(connection),
     )
 
     client = MySqlClient(
@@ -62,17 +92,153 @@ def test_mysql_client_select_success(monkeypatch: pytest.MonkeyPatch) -> None:
     result = client.select("SELECT 1")
 
     assert result.strip() == "(1,), (2,),"  # noqa: S101
-    assert connection.cursor_obj.executed_sql == "SELECT 1"  # noqa: S101
+    assert connection.cursor_obj.executed_sql == "SELECT 1 LIMIT 201"  # noqa: S101
     assert connection.closed is True  # noqa: S101
+    assert connection.cursor_obj.closed is True  # noqa: S101
+
+
+def test_mysql_client_select_truncates_to_max_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    connection = DummyConnection([(i,) for i in range(10)])
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        max_rows=3,
+        logger=DummyLogger(),
+    )
+
+    result = client.select("SELECT id FROM t")
+
+    assert result == "(0,), (1,), (2,), (truncated to the first 3 rows)"  # noqa: S101
+
+
+def test_mysql_client_select_truncates_to_max_chars(monkeypatch: pytest.MonkeyPatch) -> None:
+    connection = DummyConnection([("abcdefgh",) for _ in range(10)])
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        max_chars=40,
+        logger=DummyLogger(),
+    )
+
+    result = client.select("SELECT name FROM t")
+
+    assert result == "('abcdefgh',), ('abcdefgh',), (truncated to the first 2 rows)"  # noqa: S101
+
+
+def test_mysql_client_select_keeps_part_of_an_oversized_first_row(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    connection = DummyConnection([("x" * 100,), ("y",)])
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        max_chars=20,
+        logger=DummyLogger(),
+    )
+
+    result = client.select("SELECT blob FROM t")
+
+    assert result == "('xxxxxxxxxxxxxxxxxx, (truncated to the first 1 rows)"  # noqa: S101
+
+
+def test_mysql_client_select_streams_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    rows = [(i,) for i in range(2500)]
+    connection = DummyConnection(rows)
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        max_rows=5000,
+        max_chars=100_000,
+        logger=DummyLogger(),
+    )
+
+    result = client.select("SELECT id FROM t")
+
+    assert result == "".join(f"{row}, " for row in rows)  # noqa: S101
+
+
+def test_mysql_client_reuses_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    connection = DummyConnection([(1,)])
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+    DummyPool.created = 0
+
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        pool_size=3,
+        logger=DummyLogger(),
+    )
+
+    client.select("SELECT 1")
+    client.select("SELECT 2")
+
+    assert DummyPool.created == 1  # noqa: S101
+    assert client._pool.kwargs["pool_size"] == 3  # noqa: S101
+
+
+def test_mysql_client_close_drains_the_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    connection = DummyConnection([(1,)])
+    monkeypatch.setattr(
+        "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
+        fake_connector(connection),
+    )
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        logger=DummyLogger(),
+    )
+    client.select("SELECT 1")
+    pool = client._pool
+
+    asyncio.run(client.aclose())
+
+    assert pool is not None  # noqa: S101
+    assert pool.drained is True  # noqa: S101
+    assert client._pool is None  # noqa: S101
 
 
 def test_mysql_client_select_failure(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr(
         "fred_zulip_bot.adapters.mysql_client.MYSQL_CONNECTOR",
-        type(
-            "Connector",
-            (),
-            {"connect": staticmethod(lambda **kwargs: (_ for _ in ()).throw(RuntimeError("fail")))},
+        SimpleNamespace(
+            pooling=SimpleNamespace(
+                MySQLConnectionPool=lambda **kwargs: (_ for _ in ()).throw(RuntimeError("fail"))
+            )
         ),
     )
 
@@ -89,3 +255,51 @@ def test_mysql_client_select_failure(monkeypatch: pytest.MonkeyPatch) -> None:
 
     assert result == "salvage"  # noqa: S101
     assert logger.logged is True  # noqa: S101
+
+
+def test_mysql_client_aselect_caps_concurrency(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = MySqlClient(
+        host="host",
+        database="db",
+        user="user",
+        password="test-pw",  # noqa: S106
+        pool_size=2,
+        logger=DummyLogger(),
+    )
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def slow_select(sql: str) -> str:
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return sql
+
+    monkeypatch.setattr(client, "select", slow_select)
+
+    async def run_all() -> list[str]:
+        return await asyncio.gather(*(client.aselect(f"SELECT {i}") for i in range(6)))
+
+    assert asyncio.run(run_all()) == [f"SELECT {i}" for i in range(6)]  # noqa: S101
+    assert active["peak"] == 2  # noqa: S101
+
+
+@pytest.mark.parametrize(
+    ("sql", "expected"),
+    [
+        ("SELECT id FROM t;", "SELECT id FROM t LIMIT 11"),
+        ("SELECT id FROM t ORDER BY id DESC\n", "SELECT id FROM t ORDER BY id DESC LIMIT 11"),
+        ("SELECT id FROM t limit 5", "SELECT id FROM t limit 5"),
+        ("SELECT id FROM t LIMIT 5, 20;", "SELECT id FROM t LIMIT 5, 20"),
+        ("SELECT id FROM t LIMIT 20 OFFSET 5", "SELECT id FROM t LIMIT 20 OFFSET 5"),
+        (
+            "SELECT * FROM (SELECT id FROM t LIMIT 3) s WHERE id > 1",
+            "SELECT * FROM (SELECT id FROM t LIMIT 3) s WHERE id > 1 LIMIT 11",
+        ),
+    ],
+)
+def test_with_row_limit(sql: str, expected: str) -> None:
+    assert with_row_limit(sql, 11) == expected  # noqa: S101
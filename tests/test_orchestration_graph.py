@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import sys
 from dataclasses import dataclass, field
 from typing import Any
@@ -20,21 +21,23 @@ class StubService:
     responses: dict[IntentType, tuple[str, str, str]]
     calls: list[str] = field(default_factory=list)
 
-    def classify_intent(self, message: ZulipMessage) -> IntentType:
+    async def classify_intent(self, message: ZulipMessage) -> IntentType:
         self.calls.append(f"classify:{message.content}")
         return self.intents.pop(0)
 
-    def converse_with_fred_bot(self, message: ZulipMessage, history: list[dict[str, Any]]) -> str:
+    async def converse_with_fred_bot(
+        self, message: ZulipMessage, history: list[dict[str, Any]]
+    ) -> str:
         self.calls.append("converse_with_fred_bot")
         return self.responses[IntentType.CONVERSE_WITH_FRED_BOT][0]
 
-    def handle_unsupported_function(
+    async def handle_unsupported_function(
         self, message: ZulipMessage, history: list[dict[str, Any]]
     ) -> str:
         self.calls.append("handle_unsupported_function")
         return self.responses[IntentType.HANDLE_UNSUPPORTED_FUNCTION][0]
 
-    def query_fred(
+    async def query_fred(
         self, message: ZulipMessage, history: list[dict[str, Any]]
     ) -> tuple[str, str, str]:
         self.calls.append("query_fred")
@@ -74,7 +77,9 @@ def test_graph_routes_converse_with_fred_bot() -> None:
     logger = DummyLogger()
     runner = build_chat_graph(chat_service=service, logger=logger)
 
-    result = runner.invoke(GraphState(request=make_request("hello"), history=[], intent=None))
+    result = asyncio.run(
+        runner.ainvoke(GraphState(request=make_request("hello"), history=[], intent=None))
+    )
 
     assert result["response"] == "hi"  # noqa: S101
     assert "converse_with_fred_bot" in service.calls  # noqa: S101
@@ -92,7 +97,9 @@ def test_graph_routes_database() -> None:
     logger = DummyLogger()
     runner = build_chat_graph(chat_service=service, logger=logger)
 
-    result = runner.invoke(GraphState(request=make_request("data"), history=[], intent=None))
+    result = asyncio.run(
+        runner.ainvoke(GraphState(request=make_request("data"), history=[], intent=None))
+    )
 
     assert result["response"] == "answer"  # noqa: S101
     assert result["sql"] == "SQL"  # noqa: S101
@@ -111,6 +118,8 @@ def test_graph_default_to_handle_unsupported_function() -> None:
     logger = DummyLogger()
     runner = build_chat_graph(chat_service=service, logger=logger)
 
-    result = runner.invoke(GraphState(request=make_request("unknown"), history=[], intent=None))
+    result = asyncio.run(
+        runner.ainvoke(GraphState(request=make_request("unknown"), history=[], intent=None))
+    )
 
     assert result["response"] == "fallback"  # noqa: S101
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import pytest
+
+from fred_zulip_bot.services import response_cache
+from fred_zulip_bot.services.response_cache import (
+    LruCache,
+    intent_cache_key,
+    reply_cache_key,
+    sql_cache_key,
+)
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LruCache[str, int] = LruCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # noqa: S101
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None  # noqa: S101
+    assert cache.get("a") == 1  # noqa: S101
+    assert len(cache) == 2  # noqa: S101
+
+
+def test_lru_cache_zero_size_disables_storage() -> None:
+    cache: LruCache[str, int] = LruCache(0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None  # noqa: S101
+
+
+def test_lru_cache_expires_entries_after_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = {"now": 100.0}
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: clock["now"])
+    cache: LruCache[str, int] = LruCache(2, ttl=10)
+    cache.put("a", 1)
+
+    clock["now"] += 9
+    assert cache.get("a") == 1  # noqa: S101
+
+    clock["now"] += 1
+    assert cache.get("a") is None  # noqa: S101
+    assert len(cache) == 0  # noqa: S101
+
+
+def test_reply_cache_key_covers_all_inputs() -> None:
+    base = reply_cache_key("model", "prompt", "hi", None, None)
+
+    assert base == reply_cache_key("model", "prompt", "hi", [], None)  # noqa: S101
+    assert base != reply_cache_key("other", "prompt", "hi", None, None)  # noqa: S101
+    assert base != reply_cache_key("model", "prompt", "hi", [{"role": "user"}], None)  # noqa: S101
+    assert base != reply_cache_key("model", "prompt", "hi", None, {"a": 1})  # noqa: S101
+    assert reply_cache_key("model", "ab", "c", None, None) != reply_cache_key(  # noqa: S101
+        "model", "a", "bc", None, None
+    )
+
+
+def test_sql_cache_key_changes_with_prompt_digest() -> None:
+    base = sql_cache_key("digest", "how many projects?")
+
+    assert base == sql_cache_key("digest", "how many projects?")  # noqa: S101
+    assert base != sql_cache_key("other", "how many projects?")  # noqa: S101
+    assert base != sql_cache_key("digest", "how many languages?")  # noqa: S101
+
+
+def test_intent_cache_key_normalizes_case_and_whitespace() -> None:
+    base = intent_cache_key("What can you do?")
+
+    assert base == intent_cache_key("  what   can you\ndo?")  # noqa: S101
+    assert base != intent_cache_key("What can you do")  # noqa: S101
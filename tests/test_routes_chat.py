@@ -11,7 +11,7 @@ class StubChatService:
     def __init__(self) -> None:
         self.calls: list[ChatRequest] = []
 
-    def handle_chat_request(
+    async def handle_chat_request(
         self, request: ChatRequest, background_tasks: BackgroundTasks
     ) -> ChatResponse:
         self.calls.append(request)
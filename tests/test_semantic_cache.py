@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+
+from fred_zulip_bot.services.semantic_cache import SemanticCache
+
+
+def test_semantic_cache_returns_closest_value_above_threshold() -> None:
+    cache: SemanticCache[str] = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "greeting")
+    cache.add([0.0, 1.0], "database")
+
+    assert cache.lookup([2.0, 0.1]) == "greeting"  # noqa: S101
+    assert cache.lookup([0.1, 3.0]) == "database"  # noqa: S101
+    assert cache.lookup([1.0, 1.0]) is None  # noqa: S101
+
+
+def test_semantic_cache_ignores_zero_vectors_and_evicts_oldest() -> None:
+    cache: SemanticCache[str] = SemanticCache(max_entries=1)
+    cache.add([0.0, 0.0], "ignored")
+    assert len(cache) == 0  # noqa: S101
+
+    cache.add([1.0, 0.0], "first")
+    cache.add([0.0, 1.0], "second")
+
+    assert cache.lookup([1.0, 0.0]) is None  # noqa: S101
+    assert cache.lookup([0.0, 1.0]) == "second"  # noqa: S101
+
+
+def test_semantic_cache_alookup_scans_off_the_event_loop() -> None:
+    cache: SemanticCache[str] = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "greeting")
+    scanned_on_loop: list[bool] = []
+    original = cache.lookup
+
+    def recording_lookup(embedding: list[float]) -> str | None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            scanned_on_loop.append(False)
+        else:
+            scanned_on_loop.append(True)
+        return original(embedding)
+
+    cache.lookup = recording_lookup  # type: ignore[method-assign]
+
+    assert asyncio.run(cache.alookup([1.0, 0.1])) == "greeting"  # noqa: S101
+    assert scanned_on_loop == [False]  # noqa: S101
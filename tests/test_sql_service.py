@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 import pytest
 
-from fred_zulip_bot.services.sql_service import SqlService
+from fred_zulip_bot.services.sql_service import SqlService, strip_rtf
 
 
 @pytest.fixture
@@ -21,6 +22,8 @@ def sql_service(tmp_path: Path) -> SqlService:
     [
         "SELECT * FROM projects",
         "select name FROM users WHERE id = 1",
+        "SeLeCt\n*\nFROM projects",
+        "SELECT drop_date, created_at FROM projects",
     ],
 )
 def test_is_safe_sql_allows_selects(sql_service: SqlService, statement: str) -> None:
@@ -37,6 +40,8 @@ def test_is_safe_sql_allows_selects(sql_service: SqlService, statement: str) ->
         "SELECT * FROM x -- comment",
         "SELECT * FROM x /* no */",
         "SELECT * INTO OUTFILE 'x' FROM y",
+        "select * from x where a = 1 Load\tData",
+        "SELECT * FROM x WHERE Revoke",
     ],
 )
 def test_is_safe_sql_rejects_dangerous_statements(sql_service: SqlService, statement: str) -> None:
@@ -49,7 +54,51 @@ def test_is_safe_sql_rejects_dangerous_statements(sql_service: SqlService, state
         "  ",
         "DESCRIBE table",
         "INSERT INTO table VALUES (1)",
+        "SELECTED FROM table",
     ],
 )
 def test_is_safe_sql_rejects_non_select(sql_service: SqlService, statement: str) -> None:
     assert sql_service.is_safe_sql(statement) is False  # noqa: S101
+
+
+def test_strip_rtf_keeps_schema_text() -> None:
+    raw = (
+        "{\\rtf1\\ansi\\ansicpg1252\n{\\fonttbl\\f0\\fswiss\\fcharset0 Helvetica;}\n"
+        "{\\*\\expandedcolortbl;;}\n\\pard\\pardirnatural\n\n"
+        "\\f0\\fs24 \\cf0 CREATE TABLE `t` (\\\n  `a` int\\\n) caf\\'e9 \\{x\\};}"
+    )
+
+    assert strip_rtf(raw) == "CREATE TABLE `t` (\n  `a` int\n) café {x};\n"  # noqa: S101
+    assert strip_rtf("plain text") == "plain text"  # noqa: S101
+
+
+def test_sql_prompt_uses_plain_schema(tmp_path: Path) -> None:
+    ddl = tmp_path / "ddl.rtf"
+    ddl.write_text("{\\rtf1\\ansi \\f0 CREATE TABLE `t` (`a` int);}")
+    rules = tmp_path / "rules.txt"
+    rules.write_text("rules info")
+
+    service = SqlService(ddl_path=ddl, rules_path=rules)
+
+    assert "CREATE TABLE `t` (`a` int);" in service.sql_prompt  # noqa: S101
+    assert "\\rtf1" not in service.sql_prompt  # noqa: S101
+    assert len(service.sql_prompt_digest) == 16  # noqa: S101
+
+
+def test_context_files_are_read_once_until_modified(tmp_path: Path) -> None:
+    ddl = tmp_path / "ddl.txt"
+    ddl.write_text("CREATE TABLE a (x int);")
+    rules = tmp_path / "rules.txt"
+    rules.write_text("rules info")
+
+    first = SqlService(ddl_path=ddl, rules_path=rules)
+    second = SqlService(ddl_path=ddl, rules_path=rules)
+    assert second.sql_prompt == first.sql_prompt  # noqa: S101
+
+    ddl.write_text("CREATE TABLE b (y int);")
+    stat = ddl.stat()
+    os.utime(ddl, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    edited = SqlService(ddl_path=ddl, rules_path=rules)
+
+    assert "CREATE TABLE b" in edited.sql_prompt  # noqa: S101
+    assert edited.sql_prompt_digest != first.sql_prompt_digest  # noqa: S101
@@ -1,64 +1,91 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import base64
+from urllib.parse import parse_qs
+
+import httpx
 
 from fred_zulip_bot.adapters.zulip_client import ZulipClient
 
 
-def test_zulip_client_send_stream(monkeypatch):
-    captured: dict[str, Any] = {}
+def make_client(realm_url: str, captured: list[httpx.Request]) -> ZulipClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        captured.append(request)
+        return httpx.Response(200, json={"result": "success", "id": 42})
 
-    def fake_post(url, data, auth, timeout):  # type: ignore[override]
-        captured["url"] = url
-        captured["data"] = data
-        captured["auth"] = auth
-        captured["timeout"] = timeout
+    return ZulipClient(
+        realm_url=realm_url,
+        email="bot@example.com",
+        api_key="key",
+        transport=httpx.MockTransport(handler),
+    )
 
-    monkeypatch.setattr("fred_zulip_bot.adapters.zulip_client.requests.post", fake_post)
 
-    client = ZulipClient(realm_url="https://example.com/", email="bot@example.com", api_key="key")
+def test_zulip_client_send_stream():
+    captured: list[httpx.Request] = []
+    client = make_client("https://example.com/", captured)
 
-    client.send(
-        to=["recipient@example.com"],
-        msg_type="stream",
-        subject="topic",
-        content="hello",
-        channel_name="general",
+    asyncio.run(
+        client.send(
+            to=["recipient@example.com"],
+            msg_type="stream",
+            subject="topic",
+            content="hello",
+            channel_name="general",
+        )
     )
 
-    expected = {
-        "url": "https://example.com/api/v1/messages",
-        "data": {
-            "type": "stream",
-            "to": "general",
-            "content": "hello",
-            "subject": "topic",
-        },
-        "auth": ("bot@example.com", "key"),
-        "timeout": 10,
+    request = captured[0]
+    assert str(request.url) == "https://example.com/api/v1/messages"  # noqa: S101
+    assert parse_qs(request.content.decode()) == {  # noqa: S101
+        "type": ["stream"],
+        "to": ["general"],
+        "content": ["hello"],
+        "subject": ["topic"],
     }
-    assert captured == expected  # noqa: S101
-
+    expected_auth = base64.b64encode(b"bot@example.com:key").decode()
+    assert request.headers["Authorization"] == f"Basic {expected_auth}"  # noqa: S101
 
-def test_zulip_client_send_private(monkeypatch):
-    captured: dict[str, Any] = {}
 
-    def fake_post(url, data, auth, timeout):  # type: ignore[override]
-        captured.update({"data": data, "auth": auth})
+def test_zulip_client_send_private():
+    captured: list[httpx.Request] = []
+    client = make_client("https://example.com", captured)
 
-    monkeypatch.setattr("fred_zulip_bot.adapters.zulip_client.requests.post", fake_post)
-
-    client = ZulipClient(realm_url="https://example.com", email="bot@example.com", api_key="key")
-    client.send(
-        to=["user@example.com"],
-        msg_type="private",
-        subject="ignored",
-        content="hi",
-        channel_name="ignored",
+    message_id = asyncio.run(
+        client.send(
+            to=["user@example.com"],
+            msg_type="private",
+            subject="ignored",
+            content="hi",
+            channel_name="ignored",
+        )
     )
 
-    expected = {
-        "data": {"type": "private", "to": ["user@example.com"], "content": "hi"},
-        "auth": ("bot@example.com", "key"),
+    assert message_id == 42  # noqa: S101
+    assert parse_qs(captured[0].content.decode()) == {  # noqa: S101
+        "type": ["private"],
+        "to": ["user@example.com"],
+        "content": ["hi"],
     }
-    assert captured == expected  # noqa: S101
+
+
+def test_zulip_client_update_edits_message():
+    captured: list[httpx.Request] = []
+    client = make_client("https://example.com", captured)
+
+    asyncio.run(client.update(42, "hello again"))
+
+    request = captured[0]
+    assert request.method == "PATCH"  # noqa: S101
+    assert str(request.url) == "https://example.com/api/v1/messages/42"  # noqa: S101
+    assert parse_qs(request.content.decode()) == {"content": ["hello again"]}  # noqa: S101
+
+
+def test_zulip_client_aclose_closes_pool():
+    client = make_client("https://example.com", [])
+
+    asyncio.run(client.aclose())
+
+    assert client._client.is_closed is True  # noqa: S101